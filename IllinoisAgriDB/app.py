@@ -1,14 +1,37 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
 from flask_cors import CORS # Import CORS
 import random
+import os
 from database.db_setup import DatabaseConnection
+from database.series import series_fields, series_query, parse_date, downsample, WRITERS, FORMATS
+from database.export import export_chunks, EXPORT_FORMATS
+from ml.app import predict_bp
 import datetime
 import pandas as pd
 
 app = Flask(__name__)
 CORS(app) # Enable CORS for all routes on your app
+app.register_blueprint(predict_bp) # /api/predict routes (ml/app.py)
 db = DatabaseConnection()
-db.connect() # <-- ADD THIS LINE TO ESTABLISH THE CONNECTION
+db.startup() # engine + one app_meta read; run `python -m database.db_setup init` to load data
+
+# Seconds browsers may reuse /api/regions and /api/crops before revalidating with If-None-Match
+REFERENCE_MAX_AGE = int(os.getenv("REFERENCE_MAX_AGE", "60"))
+
+def cached_json(name, compute):
+    """
+    Serve a reference result from the in-memory cache (recomputed only when the data
+    version changes) with an ETag, so repeat requests get 304 Not Modified.
+    """
+    entry = db.cached_reference(name, compute)
+    if entry is None:
+        return jsonify([])
+    response = jsonify(entry["value"])
+    response.set_etag(entry["etag"])
+    response.cache_control.public = True
+    response.cache_control.max_age = REFERENCE_MAX_AGE
+    response.cache_control.must_revalidate = True
+    return response.make_conditional(request)
 
 @app.route('/')
 def index():
@@ -18,22 +41,22 @@ def index():
 # New endpoint to fetch unique region names
 @app.route('/api/regions')
 def get_regions():
-    location_query = """
-    SELECT DISTINCT location FROM stations
-    """
-    location_result = db.execute_query(location_query)
-    all_locations = []
-    if location_result is not None and not location_result.empty:
-        for loc in location_result['location']:
-            # Simple split by comma and strip whitespace
-            regions = [region.strip() for region in loc.split(',')]
-            all_locations.extend(regions)
-    unique_locations = sorted(list(set(all_locations)))
-    return jsonify(unique_locations)
+    return cached_json('regions', load_regions)
+
+def load_regions():
+    # Counties come from the normalized station_counties mapping built at ingest time
+    try:
+        return db.get_county_index().regions()
+    except Exception as e:
+        print(f"Error loading regions: {str(e)}")
+        return None
 
 # Modified endpoint to fetch ALL unique crop types (no region filter possible with this table)
 @app.route('/api/crops')
 def get_crops():
+    return cached_json('crops', load_crops)
+
+def load_crops():
     # Region parameter is no longer used here as crops_planning has no station link
     # selected_region = request.args.get('region') 
     
@@ -46,12 +69,14 @@ def get_crops():
     """
     
     crop_result = db.execute_query(crop_query) # No params needed now
+    if crop_result is None:
+        return None
     
     crop_types = []
-    if crop_result is not None and not crop_result.empty:
+    if not crop_result.empty:
         crop_types = crop_result['crop_name'].tolist()
         
-    return jsonify(crop_types)
+    return crop_types
 
 @app.route('/get_random_station', methods=['POST'])
 def get_random_station():
@@ -62,99 +87,33 @@ def get_random_station():
     end_date = request.form.get('end_date', '')
     
 
-    date_conditions = ""
-    if start_date and end_date:
-        date_conditions = f"AND STR_TO_DATE(CONCAT(w.year, '-', LPAD(w.month, 2, '0'), '-', LPAD(w.day, 2, '0')), '%Y-%m-%d') BETWEEN '{start_date}' AND '{end_date}'"
-    elif start_date:
-        date_conditions = f"AND STR_TO_DATE(CONCAT(w.year, '-', LPAD(w.month, 2, '0'), '-', LPAD(w.day, 2, '0')), '%Y-%m-%d') >= '{start_date}'"
-    elif end_date:
-        date_conditions = f"AND STR_TO_DATE(CONCAT(w.year, '-', LPAD(w.month, 2, '0'), '-', LPAD(w.day, 2, '0')), '%Y-%m-%d') <= '{end_date}'"
-    
-    # 1. Get a random station in one query that matches all criteria
+    # 1. Draw a random (station, date) pair from the precomputed sampling index
+    # instead of running ORDER BY RAND() over the weather/soil join
+    sampling_index = db.get_sampling_index()
+    if sampling_index.is_empty():
+        return jsonify({'error': 'No station data is loaded yet.'}), 404
+    try:
+        print(f"--- Sampling station for region '{selected_region}' and crop '{selected_crop or '(any)'}' ---")
+        sample = sampling_index.sample(selected_region, selected_crop, start_date, end_date)
 
-    station_query = f"""
-    SELECT DISTINCT s.station_name, s.location
-    FROM stations s
-    JOIN weather w ON s.station_name = w.station
-    JOIN soil so ON s.station_name = so.station
-    WHERE s.location LIKE '%{selected_region}%'
-    {date_conditions}
-    """
-    
-    if selected_crop:
-        station_query = f"""
-        SELECT DISTINCT s.station_name, s.location
-        FROM stations s
-        JOIN weather w ON s.station_name = w.station
-        JOIN soil so ON s.station_name = so.station
-        LEFT JOIN users u ON s.station_name = u.user_id
-        WHERE s.location LIKE '%{selected_region}%'
-        AND u.crop_type = '{selected_crop}'
-        {date_conditions}
-        """
-    
-    station_query += " ORDER BY RAND() LIMIT 1"
-    
-    print(f"--- Attempting initial station query for region '{selected_region}' and crop '{selected_crop or "(any)"}' ---") # Log initial attempt
-    station_result = db.execute_query(station_query)
-    
-    # If no station found with all criteria, try fallback query without crop filter
-    if station_result is None or station_result.empty:
-        if selected_crop:
-            # Try again without the crop filter
-            print(f"--- Initial query failed. Falling back to region '{selected_region}' only (no crop filter) ---") # Log fallback 1
-            fallback_query = f"""
-            SELECT DISTINCT s.station_name, s.location
-            FROM stations s
-            JOIN weather w ON s.station_name = w.station
-            JOIN soil so ON s.station_name = so.station
-            WHERE s.location LIKE '%{selected_region}%'
-            {date_conditions}
-            ORDER BY RAND() LIMIT 1
-            """
-            station_result = db.execute_query(fallback_query)
-        
-        # If still no result, try with just the region
-        if station_result is None or station_result.empty:
-            # Use a simpler query just filtering by region if others fail
-            print(f"--- Fallback 1 failed. Falling back to simplest region '{selected_region}' query ---") # Log fallback 2
-            fallback_query = f"""
-            SELECT station_name, location
-            FROM stations
-            WHERE location LIKE '%{selected_region}%'
-            ORDER BY RAND() LIMIT 1
-            """
-            station_result = db.execute_query(fallback_query)
-            
-            if station_result is None or station_result.empty:
+        # If no pair matches all criteria, try again without the crop filter
+        if sample is None and selected_crop:
+            print(f"--- Initial sample failed. Falling back to region '{selected_region}' only (no crop filter) ---")
+            sample = sampling_index.sample(selected_region, None, start_date, end_date)
+
+        if sample is not None:
+            station_name, random_date = sample
+        else:
+            # Fall back to any station in the region, then look for a paired date at that station
+            print(f"--- Fallback 1 failed. Falling back to simplest region '{selected_region}' sample ---")
+            station_name = sampling_index.random_station(selected_region)
+            if station_name is None:
                 return jsonify({'error': 'No stations found for the selected region. Try a different region.'})
-    
-    # Extract the selected station
-    station_name = station_result.iloc[0]['station_name']
-    station_location = station_result.iloc[0]['location']
-    
-    # 2. Get a random date for this station that has both weather and soil data
-    # Again using ORDER BY RAND() to select directly in the database
-    date_query = f"""
-    SELECT w.year, w.month, w.day
-    FROM weather w
-    JOIN soil s ON w.station = s.station AND w.year = s.year AND w.month = s.month AND w.day = s.day
-    WHERE w.station = '{station_name}'
-    """
-    
-    # Apply date filters if provided
-    if start_date and end_date:
-        date_query += f" AND STR_TO_DATE(CONCAT(w.year, '-', LPAD(w.month, 2, '0'), '-', LPAD(w.day, 2, '0')), '%Y-%m-%d') BETWEEN '{start_date}' AND '{end_date}'"
-    elif start_date:
-        date_query += f" AND STR_TO_DATE(CONCAT(w.year, '-', LPAD(w.month, 2, '0'), '-', LPAD(w.day, 2, '0')), '%Y-%m-%d') >= '{start_date}'"
-    elif end_date:
-        date_query += f" AND STR_TO_DATE(CONCAT(w.year, '-', LPAD(w.month, 2, '0'), '-', LPAD(w.day, 2, '0')), '%Y-%m-%d') <= '{end_date}'"
-    
-    # Add random selection and limit
-    date_query += " ORDER BY RAND() LIMIT 1"
-    
-    # Get one random date
-    random_date_result = db.execute_query(date_query)
+            random_date = sampling_index.sample_station(station_name, start_date, end_date)
+    except ValueError:
+        return jsonify({'error': 'Invalid date. Use the YYYY-MM-DD format.'})
+
+    station_location = sampling_index.locations[station_name]
     
     # Initialize response structure
     response = {
@@ -171,92 +130,204 @@ def get_random_station():
         response['crop'] = selected_crop
     
     # If we found a date with both weather and soil data
-    if random_date_result is not None and not random_date_result.empty:
-        year = random_date_result.iloc[0]['year']
-        month = random_date_result.iloc[0]['month']
-        day = random_date_result.iloc[0]['day']
+    if random_date is not None:
+        year = random_date.year
+        month = random_date.month
+        day = random_date.day
         
-        # 3. Get both weather and soil data in a single query
+        # 2. Get both weather and soil data with a single point lookup
 
-        data_query = f"""
+        data_query = """
         SELECT 
             w.avg_air_temp, w.precip,
             s.max_soil_temp_2in_bare, s.min_soil_temp_2in_bare
         FROM weather w
         JOIN soil s ON 
             w.station = s.station AND 
-            w.year = s.year AND 
-            w.month = s.month AND 
-            w.day = s.day
-        WHERE w.station = '{station_name}'
-        AND w.year = {year} AND w.month = {month} AND w.day = {day}
+            w.obs_date = s.obs_date
+        WHERE w.station = :station
+        AND w.obs_date = :obs_date
         LIMIT 1
         """
         
-        combined_data = db.execute_query(data_query)
+        # Point read: fetch a plain tuple instead of building a DataFrame
+        data_row = db.fetch_one(data_query, {'station': station_name, 'obs_date': random_date})
         
-        if combined_data is not None and not combined_data.empty:
-            data_row = combined_data.iloc[0]
+        if data_row is not None:
+            avg_air_temp, precip, max_soil_temp, min_soil_temp = data_row
             
             # Add weather data
             response['weather'] = {
                 'date': f"{year}-{month}-{day}",
-                'avg_temp': float(data_row['avg_air_temp']),
-                'precipitation': str(data_row['precip']) if 'precip' in data_row else '0.0'
+                'avg_temp': float(avg_air_temp),
+                'precipitation': str(precip)
             }
             
             # Add soil data
             response['soil'] = {
                 'date': f"{year}-{month}-{day}",
-                'max_soil_temp': float(data_row['max_soil_temp_2in_bare']),
-                'min_soil_temp': float(data_row['min_soil_temp_2in_bare'])
+                'max_soil_temp': float(max_soil_temp),
+                'min_soil_temp': float(min_soil_temp)
             }
     else:
         # Fallback if no dates with both weather and soil data:
         
-        # Try to get at least some weather data
-        weather_query = f"""
-        SELECT year, month, day, avg_air_temp, precip
-        FROM weather
-        WHERE station = '{station_name}'
-        ORDER BY RAND() LIMIT 1
-        """
-        weather_data = db.execute_query(weather_query)
+        # Try to get at least some weather and soil data, on days drawn from the
+        # sampling index and read by primary key rather than with ORDER BY RAND()
+        weather_date = sampling_index.sample_reading('weather', station_name)
+        weather_row = None
+        if weather_date is not None:
+            weather_query = """
+            SELECT year, month, day, avg_air_temp, precip
+            FROM weather
+            WHERE station = :station AND obs_date = :obs_date
+            LIMIT 1
+            """
+            weather_row = db.fetch_one(weather_query, {'station': station_name, 'obs_date': weather_date})
         
-        if weather_data is not None and not weather_data.empty:
-            weather_row = weather_data.iloc[0]
-            year = weather_row['year']
-            month = weather_row['month']
-            day = weather_row['day']
+        if weather_row is not None:
+            year, month, day, avg_air_temp, precip = weather_row
             
             response['weather'] = {
                 'date': f"{year}-{month}-{day}",
-                'avg_temp': float(weather_row['avg_air_temp']),
-                'precipitation': str(weather_row['precip']) if 'precip' in weather_row else '0.0'
+                'avg_temp': float(avg_air_temp),
+                'precipitation': str(precip)
             }
         
-        # Try to get at least some soil data
-        soil_query = f"""
-        SELECT year, month, day, max_soil_temp_2in_bare, min_soil_temp_2in_bare
-        FROM soil
-        WHERE station = '{station_name}'
-        ORDER BY RAND() LIMIT 1
-        """
-        soil_data = db.execute_query(soil_query)
+        soil_date = sampling_index.sample_reading('soil', station_name)
+        soil_row = None
+        if soil_date is not None:
+            soil_query = """
+            SELECT year, month, day, max_soil_temp_2in_bare, min_soil_temp_2in_bare
+            FROM soil
+            WHERE station = :station AND obs_date = :obs_date
+            LIMIT 1
+            """
+            soil_row = db.fetch_one(soil_query, {'station': station_name, 'obs_date': soil_date})
         
-        if soil_data is not None and not soil_data.empty:
-            soil_row = soil_data.iloc[0]
-            year = soil_row['year']
-            month = soil_row['month']
-            day = soil_row['day']
+        if soil_row is not None:
+            year, month, day, max_soil_temp, min_soil_temp = soil_row
             
             response['soil'] = {
                 'date': f"{year}-{month}-{day}",
-                'max_soil_temp': float(soil_row['max_soil_temp_2in_bare']),
-                'min_soil_temp': float(soil_row['min_soil_temp_2in_bare'])
+                'max_soil_temp': float(max_soil_temp),
+                'min_soil_temp': float(min_soil_temp)
             }
     
     return jsonify(response)
 
+# Date range of readings for one station, streamed as NDJSON (default) or CSV
+# e.g. /api/stations/Peoria/series?start=2020-01-01&end=2022-12-31&fields=avg_air_temp,precip&resolution=week&points=500
+@app.route('/api/stations/<name>/series')
+def get_station_series(name):
+    available = db.cached_reference('series_fields', lambda: series_fields(db.connect()))
+    available = available["value"] if available else {}
+    output = request.args.get('format', 'ndjson')
+    try:
+        if output not in FORMATS:
+            raise ValueError(f"Unknown format '{output}', expected one of {tuple(FORMATS)}")
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or list(available)
+        points = request.args.get('points', type=int)
+        if points is not None and points < 3:
+            raise ValueError("'points' must be at least 3")
+        start = parse_date(request.args.get('start'), 'start')
+        end = parse_date(request.args.get('end'), 'end')
+        query, params, columns = series_query(
+            db.engine.dialect.name, available, fields, request.args.get('resolution', 'day'), start, end
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if db.fetch_one("SELECT 1 FROM stations WHERE station_name = :name", {"name": name}) is None:
+        return jsonify({"error": f"Unknown station '{name}'"}), 404
+
+    params["station"] = name
+    rows = db.stream_rows(query, params)
+    try:
+        # Run the query before answering, so SQL errors are a 500 and not a truncated 200
+        first = next(rows, None)
+    except Exception as e:
+        print(f"Error streaming series for {name}: {str(e)}")
+        return jsonify({"error": "Could not read the series"}), 500
+
+    def all_rows():
+        if first is not None:
+            yield first
+            yield from rows
+
+    if points is not None:
+        # LTTB needs the whole (already aggregated) range, as plain tuples
+        body = downsample(list(all_rows()), columns, fields, points)
+    else:
+        body = all_rows()
+    return Response(WRITERS[output](columns, body), mimetype=FORMATS[output])
+
+# Days flagged by the streaming anomaly detector (database/anomalies.py), newest first
+# e.g. /api/anomalies?station=Peoria&since=2023-01-01&limit=50
+@app.route('/api/anomalies')
+def get_anomalies():
+    try:
+        since = parse_date(request.args.get('since'), 'since')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    station = request.args.get('station')
+
+    where, params = [], {"limit": limit}
+    if station:
+        where.append("station = :station")
+        params["station"] = station
+    if since:
+        where.append("obs_date >= :since")
+        params["since"] = since
+    rows = db.fetch_rows(f"""
+    SELECT station, obs_date, temp, temp_z, precip, precip_z
+    FROM anomalies
+    {"WHERE " + " AND ".join(where) if where else ""}
+    ORDER BY obs_date DESC, station
+    LIMIT :limit
+    """, params)
+    if rows is None:
+        return jsonify([])
+    return jsonify([
+        {
+            "station": station_name,
+            "date": str(obs_date)[:10],
+            "temp": temp, "temp_z": temp_z,
+            "precip": precip, "precip_z": precip_z
+        }
+        for station_name, obs_date, temp, temp_z, precip, precip_z in rows
+    ])
+
+# Bulk export of weather or soil as Parquet (default) or an Arrow IPC stream, written in chunks
+# e.g. /api/export/weather?format=arrow&county=Peoria&start=2020-01-01&end=2020-12-31
+@app.route('/api/export/<table>')
+def export_table(table):
+    output = request.args.get('format', 'parquet')
+    filters = {key: request.args.get(key) for key in ('station', 'county', 'start', 'end')}
+    chunks = export_chunks(db, table, output, **filters)
+    try:
+        # Validates the parameters and writes the file header before the response starts
+        first = next(chunks)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error exporting {table}: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+    def body():
+        yield first
+        yield from chunks
+
+    extension, mimetype = EXPORT_FORMATS[output]
+    response = Response(body(), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{table}{extension}"'
+    return response
+
+# Connection pool state and checkout wait times, for sizing the pool and workers
+@app.route('/api/stats/pool')
+def get_pool_stats():
+    return jsonify(db.pool_status())
+
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
@@ -0,0 +1,200 @@
+import os
+import time
+import datetime
+import numpy as np
+import pandas as pd
+from database.column_store import ColumnStore, PROJECT_DATA
+
+# In-process versions of the four analysis reports (database/reports.py), computed with
+# pandas groupbys over the column store instead of SQL. Each report returns a DataFrame
+# with the same columns as its SQL query.
+
+# Small reference tables are read straight from their CSVs
+CSV_TABLES = {"users": "user.csv", "crops_planning": "crop_and_planning.csv"}
+
+SEASON_ORDER = {"Spring": 1, "Summer": 2, "Fall": 3, "Winter": 4}
+
+
+def season_of(month):
+    """Vectorized version of the reports' month -> season CASE"""
+    month = np.asarray(month)
+    return np.select(
+        [(month >= 3) & (month <= 5), (month >= 6) & (month <= 8), (month >= 9) & (month <= 11)],
+        ["Spring", "Summer", "Fall"],
+        default="Winter"
+    )
+
+
+def pop_std(values):
+    """STDDEV() in MySQL is the population standard deviation"""
+    return values.std(ddof=0)
+
+
+class AnalyticsEngine:
+    """
+    Computes the Regional, User Expertise, Environmental Anomaly and Seasonal
+    Planning reports without a database server. Tables come from `tables`
+    ({name: DataFrame}, e.g. already in memory) or are loaded on first use:
+    weather, soil and stations from the column store, users and crops_planning
+    from their CSVs.
+    """
+
+    def __init__(self, data_dir=PROJECT_DATA, tables=None):
+        self.data_dir = data_dir
+        self.store = ColumnStore(data_dir)
+        self.tables = dict(tables or {})
+        self.reports = {
+            "Regional Analysis": self.regional_analysis,
+            "User Expertise Analysis": self.expertise_analysis,
+            "Environmental Anomaly Analysis": self.anomaly_analysis,
+            "Seasonal Planning Analysis": self.seasonal_analysis
+        }
+
+    def table(self, name):
+        """Return a table, loading it on first use; dated tables get an obs_date column"""
+        if name not in self.tables:
+            if name in CSV_TABLES:
+                df = pd.read_csv(os.path.join(self.data_dir, CSV_TABLES[name]))
+            else:
+                df = self.store.load(name)
+            if "obs_date" not in df.columns and "date" in df.columns:
+                df["obs_date"] = pd.to_datetime(df["date"])
+            self.tables[name] = df
+        return self.tables[name]
+
+    def run(self, name):
+        """Compute one report by name and print how long it took"""
+        start = time.perf_counter()
+        result = self.reports[name]()
+        print(f"{name}: {len(result)} rows in {time.perf_counter() - start:.3f}s (in-process)")
+        return result
+
+    def regional_analysis(self):
+        """Query 1: per crop and location, average paired soil/weather readings since 2020"""
+        soil = self.table("soil")
+        weather = self.table("weather")
+        stations = self.table("stations")[["station_name", "location"]]
+
+        recent = soil[soil["obs_date"] >= "2020-01-01"]
+        paired = recent[["station", "obs_date", "max_soil_temp_4in_sod", "min_soil_temp_4in_sod"]].merge(
+            weather[["station", "obs_date", "precip"]], on=["station", "obs_date"]
+        ).merge(stations, left_on="station", right_on="station_name")
+        rss = paired.groupby(["location", "obs_date"], as_index=False).agg(
+            avg_max_soil_temp=("max_soil_temp_4in_sod", "mean"),
+            avg_min_soil_temp=("min_soil_temp_4in_sod", "mean"),
+            avg_precipitation=("precip", "mean")
+        )
+
+        # Each (location, day) counts once per station in the location with a soil row that day
+        rows = rss.merge(stations, on="location").merge(
+            soil[["station", "obs_date"]], left_on=["station_name", "obs_date"], right_on=["station", "obs_date"]
+        )
+        by_location = rows.groupby("location", as_index=False).agg(
+            avg_max_soil_temp=("avg_max_soil_temp", "mean"),
+            avg_min_soil_temp=("avg_min_soil_temp", "mean"),
+            avg_rainfall=("avg_precipitation", "mean"),
+            station_count=("station", "nunique")
+        )
+        by_location = by_location[by_location["station_count"] >= 2]
+
+        crops = pd.DataFrame({"crop_type": self.table("crops_planning")["Crop"].drop_duplicates()})
+        result = crops.merge(by_location, how="cross")
+        result = result.round({"avg_max_soil_temp": 1, "avg_min_soil_temp": 1, "avg_rainfall": 2})
+        return result.sort_values("crop_type", kind="stable", ignore_index=True)[[
+            "crop_type", "location", "avg_max_soil_temp", "avg_min_soil_temp", "avg_rainfall", "station_count"
+        ]]
+
+    def expertise_analysis(self):
+        """Query 2: weather records available around each user's station"""
+        users = self.table("users")
+        stations = self.table("stations")[["station_name", "location"]]
+        weather = self.table("weather")
+
+        managed = stations["station_name"].nunique()
+        experts = users[["user_id", "crop_type"]].drop_duplicates().rename(columns={"crop_type": "preferred_crop"})
+        experts["managed_stations"] = managed
+        if managed < 2:
+            experts = experts.iloc[0:0]
+
+        # user_id -> locations of the station with that name -> every stations row in those locations
+        records = weather.loc[weather["obs_date"].notna(), "station"].value_counts()
+        nearby = stations.merge(stations, on="location", suffixes=("_user", ""))
+        nearby = nearby[["station_name_user", "station_name"]].drop_duplicates()
+        nearby = nearby.merge(stations[["station_name"]], on="station_name")
+        nearby["records"] = nearby["station_name"].map(records).fillna(0)
+        per_user = nearby.groupby("station_name_user")["records"].sum()
+
+        experts["weather_records"] = experts["user_id"].map(per_user).fillna(0).astype(np.int64)
+        return experts.sort_values("managed_stations", ascending=False, kind="stable", ignore_index=True)
+
+    def anomaly_analysis(self, today=None):
+        """Query 3: last year's station-months more than 1.5 stddev away from the monthly norm"""
+        weather = self.table("weather")
+        stations = self.table("stations")[["station_name", "location"]]
+        this_year = pd.Timestamp(datetime.date((today or datetime.date.today()).year, 1, 1))
+        last_year = this_year - pd.DateOffset(years=1)
+
+        history = weather[weather["obs_date"] < this_year]
+        norms = history.groupby(["station", "month"]).agg(
+            avg_temp_norm=("avg_air_temp", "mean"),
+            temp_stddev=("avg_air_temp", pop_std),
+            avg_precip_norm=("precip", "mean"),
+            precip_stddev=("precip", pop_std)
+        ).reset_index()
+
+        recent = weather[(weather["obs_date"] >= last_year) & (weather["obs_date"] < this_year)]
+        recent = recent.merge(stations, left_on="station", right_on="station_name").merge(
+            norms, on=["station", "month"]
+        )
+        recent["ym"] = recent["obs_date"].dt.strftime("%Y-%m")
+        recent["temp_diff"] = recent["avg_air_temp"] - recent["avg_temp_norm"]
+        recent["precip_diff"] = recent["precip"] - recent["avg_precip_norm"]
+
+        result = recent.groupby(["station", "location", "ym"], as_index=False).agg(
+            temp_diff=("temp_diff", "mean"),
+            temp_stddev=("temp_stddev", "first"),
+            precip_diff=("precip_diff", "mean"),
+            precip_stddev=("precip_stddev", "first"),
+            days_count=("station", "size")
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Division by a zero stddev is NULL in SQL
+            temp = (result["temp_diff"] / result["temp_stddev"]).replace([np.inf, -np.inf], np.nan)
+            precip = (result["precip_diff"] / result["precip_stddev"]).replace([np.inf, -np.inf], np.nan)
+        result = pd.DataFrame({
+            "station_name": result["station"],
+            "location": result["location"],
+            "month": result["ym"],
+            "temp_anomaly": temp.round(2),
+            "precip_anomaly": precip.round(2),
+            "days_count": result["days_count"]
+        })
+        result = result[(result["temp_anomaly"].abs() > 1.5) | (result["precip_anomaly"].abs() > 1.5)]
+        order = result["temp_anomaly"].abs().sort_values(ascending=False, kind="stable").index
+        return result.loc[order].reset_index(drop=True)
+
+    def seasonal_analysis(self):
+        """Query 4: per location and season, average station climate plus the list of crops"""
+        weather = self.table("weather")
+        stations = self.table("stations")[["station_name", "location"]]
+
+        rows = stations.merge(weather[["station", "month", "avg_air_temp", "precip"]],
+                              left_on="station_name", right_on="station")
+        rows["season"] = season_of(rows["month"])
+        seasonal = rows.groupby(["station_name", "location", "season"], as_index=False).agg(
+            avg_temp=("avg_air_temp", "mean"),
+            avg_precip=("precip", "mean")
+        )
+        result = seasonal.groupby(["location", "season"], as_index=False).agg(
+            avg_temperature=("avg_temp", "mean"),
+            avg_precipitation=("avg_precip", "mean"),
+            station_count=("station_name", "nunique")
+        )
+        result = result.round({"avg_temperature": 1, "avg_precipitation": 2})
+        crops = self.table("crops_planning")["Crop"].dropna().astype(str).unique()
+        result["suitable_crops"] = ",".join(sorted(crops)) if len(crops) else None
+        if self.table("crops_planning").empty:
+            result = result.iloc[0:0]
+
+        result["order"] = result["season"].map(SEASON_ORDER)
+        return result.sort_values(["location", "order"], ignore_index=True).drop(columns="order")
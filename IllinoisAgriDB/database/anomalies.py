@@ -0,0 +1,219 @@
+import os
+import math
+import time
+import datetime
+from sqlalchemy import text, inspect
+from database.dialect import upsert_clause
+
+# Continuous version of the Environmental Anomaly report. Per (station, calendar month) the
+# anomaly_norms table keeps Welford running statistics (count, mean, M2) of each measure.
+# Every newly ingested weather day is scored against the norms so far, then folded into
+# them: O(1) per day, no aggregation over history. Days whose z-score passes the threshold
+# are stored in the anomalies table, which /api/anomalies reads.
+
+# measure -> weather column
+ANOMALY_MEASURES = {"temp": "avg_air_temp", "precip": "precip"}
+
+# |z| above which a day is flagged, and how many days a norm needs before it scores anything
+ANOMALY_THRESHOLD = float(os.getenv("ANOMALY_THRESHOLD", "2.5"))
+ANOMALY_MIN_DAYS = int(os.getenv("ANOMALY_MIN_DAYS", "10"))
+
+EMPTY = (0, 0.0, 0.0)
+
+
+def welford_update(state, x):
+    """Add one value to (n, mean, M2)"""
+    n, mean, m2 = state
+    n += 1
+    delta = x - mean
+    mean += delta / n
+    return n, mean, m2 + delta * (x - mean)
+
+
+def welford_merge(a, b):
+    """Combine two (n, mean, M2) summaries of disjoint samples (Chan et al.)"""
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    if n == 0:
+        return EMPTY
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+def zscore(state, x, min_days=ANOMALY_MIN_DAYS):
+    """(x - mean) / population stddev, or None when the norm is too thin or flat"""
+    n, mean, m2 = state
+    if n < min_days or m2 <= 0:
+        return None
+    return (x - mean) / math.sqrt(m2 / n)
+
+
+def _value(x):
+    """Measure value as a float, None for NULL/NaN"""
+    if x is None:
+        return None
+    x = float(x)
+    return None if math.isnan(x) else x
+
+
+def _day(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+class AnomalyService:
+    """
+    Keeps anomaly_norms up to date and flags anomalous days into anomalies.
+    rebuild() recomputes the norms from the weather_monthly rollup (merging each
+    month's n / sum / sum of squares); score() handles newly ingested days.
+    """
+
+    def __init__(self, engine, threshold=ANOMALY_THRESHOLD, min_days=ANOMALY_MIN_DAYS):
+        self.engine = engine
+        self.threshold = threshold
+        self.min_days = min_days
+
+    @staticmethod
+    def norm_columns():
+        columns = []
+        for measure in ANOMALY_MEASURES:
+            columns += [f"n_{measure}", f"mean_{measure}", f"m2_{measure}"]
+        return columns
+
+    def ensure_tables(self):
+        """Create anomaly_norms and anomalies if they are missing"""
+        existing = set(inspect(self.engine).get_table_names())
+        with self.engine.begin() as conn:
+            if "anomaly_norms" not in existing:
+                stats = ",\n".join(
+                    f"    {c} {'INT' if c.startswith('n_') else 'DOUBLE'} NOT NULL" for c in self.norm_columns()
+                )
+                conn.execute(text(f"""
+                CREATE TABLE anomaly_norms (
+                    station VARCHAR(64) NOT NULL,
+                    month INT NOT NULL,
+                {stats},
+                    PRIMARY KEY (station, month)
+                )
+                """))
+            if "anomalies" not in existing:
+                measures = ",\n".join(
+                    f"    {m} DOUBLE,\n    {m}_z DOUBLE" for m in ANOMALY_MEASURES
+                )
+                conn.execute(text(f"""
+                CREATE TABLE anomalies (
+                    station VARCHAR(64) NOT NULL,
+                    obs_date DATE NOT NULL,
+                {measures},
+                    flagged_at DATETIME NOT NULL,
+                    PRIMARY KEY (station, obs_date)
+                )
+                """))
+                conn.execute(text("CREATE INDEX idx_anomalies_date ON anomalies (obs_date)"))
+
+    def rebuild(self):
+        """
+        Recompute every norm from weather_monthly; returns the number of (station, month) norms.
+        Runs after a full reload, so flags scored against the old rows and norms are cleared too.
+        """
+        start = time.perf_counter()
+        self.ensure_tables()
+        sums = ", ".join(f"n_{m}, sum_{m}, sumsq_{m}" for m in ANOMALY_MEASURES)
+        norms = {}
+        with self.engine.begin() as conn:
+            rows = conn.execute(text(f"SELECT station, month, {sums} FROM weather_monthly")).fetchall()
+            for row in rows:
+                key = (row[0], int(row[1]))
+                states = norms.setdefault(key, {m: EMPTY for m in ANOMALY_MEASURES})
+                for i, measure in enumerate(ANOMALY_MEASURES):
+                    n, total, total_sq = row[2 + 3 * i:5 + 3 * i]
+                    if not n:
+                        continue
+                    mean = total / n
+                    # One month's M2 from its sums; months are then merged exactly
+                    part = (int(n), mean, max(total_sq - total * mean, 0.0))
+                    states[measure] = welford_merge(states[measure], part)
+            conn.execute(text("DELETE FROM anomaly_norms"))
+            conn.execute(text("DELETE FROM anomalies"))
+            self._write_norms(conn, norms)
+        print(f"Rebuilt {len(norms)} anomaly norms in {time.perf_counter() - start:.2f}s")
+        return len(norms)
+
+    def _write_norms(self, conn, norms):
+        if not norms:
+            return
+        columns = self.norm_columns()
+        params = []
+        for (station, month), states in norms.items():
+            row = {"station": station, "month": month}
+            for measure, (n, mean, m2) in states.items():
+                row.update({f"n_{measure}": n, f"mean_{measure}": mean, f"m2_{measure}": m2})
+            params.append(row)
+        conn.execute(text(f"""
+        INSERT INTO anomaly_norms (station, month, {", ".join(columns)})
+        VALUES (:station, :month, {", ".join(f":{c}" for c in columns)})
+        {upsert_clause(conn.dialect, columns)}
+        """), params)
+
+    def load_norms(self, conn, stations):
+        """{(station, month): {measure: (n, mean, M2)}} for the given stations"""
+        columns = self.norm_columns()
+        norms = {}
+        for station in stations:
+            rows = conn.execute(text(f"""
+            SELECT month, {", ".join(columns)} FROM anomaly_norms WHERE station = :station
+            """), {"station": station}).fetchall()
+            for row in rows:
+                norms[(station, int(row[0]))] = {
+                    measure: (int(row[1 + 3 * i]), float(row[2 + 3 * i]), float(row[3 + 3 * i]))
+                    for i, measure in enumerate(ANOMALY_MEASURES)
+                }
+        return norms
+
+    def score(self, rows):
+        """
+        Score new weather days, then fold them into the norms.
+        rows: (station, obs_date, avg_air_temp, precip) tuples not seen before.
+        Returns the flagged days as dicts.
+        """
+        self.ensure_tables()
+        rows = sorted(rows, key=lambda r: (_day(r[1]), r[0]))
+        if not rows:
+            return []
+        flagged = []
+        now = datetime.datetime.now().replace(microsecond=0)
+        with self.engine.begin() as conn:
+            norms = self.load_norms(conn, {r[0] for r in rows})
+            touched = {}
+            for station, obs_date, *values in rows:
+                day = _day(obs_date)
+                key = (station, day.month)
+                states = norms.setdefault(key, {m: EMPTY for m in ANOMALY_MEASURES})
+                day_row = {"station": station, "obs_date": day, "flagged_at": now}
+                is_anomaly = False
+                for measure, x in zip(ANOMALY_MEASURES, values):
+                    x = _value(x)
+                    z = None if x is None else zscore(states[measure], x, self.min_days)
+                    day_row[measure] = x
+                    day_row[f"{measure}_z"] = None if z is None else round(z, 3)
+                    is_anomaly = is_anomaly or (z is not None and abs(z) > self.threshold)
+                    if x is not None:
+                        states[measure] = welford_update(states[measure], x)
+                touched[key] = states
+                if is_anomaly:
+                    flagged.append(day_row)
+
+            self._write_norms(conn, touched)
+            if flagged:
+                columns = [c for c in flagged[0] if c not in ("station", "obs_date")]
+                conn.execute(text(f"""
+                INSERT INTO anomalies (station, obs_date, {", ".join(columns)})
+                VALUES (:station, :obs_date, {", ".join(f":{c}" for c in columns)})
+                {upsert_clause(conn.dialect, columns)}
+                """), flagged)
+        print(f"Scored {len(rows)} new days for anomalies: {len(flagged)} flagged")
+        return flagged
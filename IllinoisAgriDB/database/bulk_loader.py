@@ -0,0 +1,155 @@
+import os
+import time
+import pandas as pd
+from sqlalchemy import text, Float, Text
+from database.dialect import upsert_clause
+
+DEFAULT_CHUNK_SIZE = 50000
+LOAD_METHODS = ("executemany", "infile")
+# Date parts: whole numbers in every source CSV, so they keep the integer type pandas infers
+INTEGER_COLUMNS = ("year", "month", "day")
+
+
+def placeholder(dialect):
+    """Return the positional parameter marker the DBAPI driver expects"""
+    return "?" if dialect.paramstyle == "qmark" else "%s"
+
+
+def column_types(chunk):
+    """
+    SQL types for a table created from its first chunk, widened for what later chunks may hold:
+    other integer columns become DOUBLE (later decimals would be silently rounded) and
+    columns with no values yet become TEXT (a FLOAT column rejects later text).
+    Columns not listed keep the type pandas infers.
+    """
+    types = {}
+    for column in chunk.columns:
+        if chunk[column].isna().all():
+            types[column] = Text()
+        elif pd.api.types.is_integer_dtype(chunk[column]) and column not in INTEGER_COLUMNS:
+            types[column] = Float(precision=53)
+    return types
+
+
+def to_records(chunk):
+    """Turn a DataFrame chunk into a list of tuples with NaN replaced by None"""
+    return list(chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None))
+
+
+class BulkLoader:
+    """
+    Stream CSV files into database tables in fixed-size chunks.
+
+    Each table is created from the (widened) column types of the first chunk and then
+    filled inside a single transaction, either with multi-row executemany
+    batches (works on any backend) or with MySQL's LOAD DATA LOCAL INFILE.
+    Memory use is bounded by chunk_size rather than by the file size.
+    """
+
+    def __init__(self, engine, chunk_size=DEFAULT_CHUNK_SIZE, method="executemany"):
+        if method not in LOAD_METHODS:
+            raise ValueError(f"Unknown load method '{method}', expected one of {LOAD_METHODS}")
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.method = method
+
+    def load_csv(self, path, table_name):
+        """Replace `table_name` with the contents of the CSV at `path`, return load stats"""
+        start = time.perf_counter()
+        reader = pd.read_csv(path, chunksize=self.chunk_size)
+        first_chunk = next(reader, None)
+        if first_chunk is None:
+            print(f"Warning: {os.path.basename(path)} is empty, skipping '{table_name}'")
+            return {"table": table_name, "rows": 0, "seconds": 0.0}
+
+        with self.engine.begin() as conn:
+            # Create (or recreate) an empty table with the inferred types, widened to fit later chunks
+            first_chunk.head(0).to_sql(table_name, con=conn, if_exists="replace", index=False,
+                                       dtype=column_types(first_chunk))
+
+            if self.method == "infile" and conn.dialect.name != "mysql":
+                print(f"LOAD DATA LOCAL INFILE needs MySQL, loading '{table_name}' with executemany instead")
+
+            if self.method == "infile" and conn.dialect.name == "mysql":
+                rows = self._load_infile(conn, path, table_name, first_chunk.columns)
+                self._report(table_name, rows, start)
+            else:
+                rows = 0
+                insert = self.insert_statement(conn.dialect, table_name, first_chunk.columns)
+                for chunk in self._chain(first_chunk, reader):
+                    conn.exec_driver_sql(insert, to_records(chunk))
+                    rows += len(chunk)
+                    self._report(table_name, rows, start)
+
+        seconds = time.perf_counter() - start
+        print(f"Loaded {rows:,} rows into '{table_name}' in {seconds:.2f}s")
+        return {"table": table_name, "rows": rows, "seconds": seconds}
+
+    def upsert_csv(self, path, table_name, columns, prepare=None):
+        """
+        Stream the CSV at `path` into an existing table with INSERT ... ON DUPLICATE KEY UPDATE
+        (ON CONFLICT DO UPDATE on SQLite).
+        `prepare(chunk)` may filter or extend each chunk before it is written; only `columns`
+        are sent. Everything runs in one transaction. Returns load stats.
+        """
+        start = time.perf_counter()
+        rows = 0
+        with self.engine.begin() as conn:
+            upsert = self.upsert_statement(conn.dialect, table_name, columns)
+            for chunk in pd.read_csv(path, chunksize=self.chunk_size):
+                if prepare is not None:
+                    chunk = prepare(chunk)
+                if chunk.empty:
+                    continue
+                conn.exec_driver_sql(upsert, to_records(chunk[columns]))
+                rows += len(chunk)
+                self._report(table_name, rows, start)
+
+        seconds = time.perf_counter() - start
+        print(f"Upserted {rows:,} rows into '{table_name}' in {seconds:.2f}s")
+        return {"table": table_name, "rows": rows, "seconds": seconds}
+
+    @classmethod
+    def upsert_statement(cls, dialect, table_name, columns):
+        """Build a positional INSERT that updates the existing row on a unique key conflict"""
+        return f"{cls.insert_statement(dialect, table_name, columns)} {upsert_clause(dialect, columns)}"
+
+    @staticmethod
+    def insert_statement(dialect, table_name, columns):
+        """Build a positional INSERT for the given columns"""
+        quote = dialect.identifier_preparer.quote
+        column_list = ", ".join(quote(c) for c in columns)
+        values = ", ".join(placeholder(dialect) for _ in columns)
+        return f"INSERT INTO {quote(table_name)} ({column_list}) VALUES ({values})"
+
+    @staticmethod
+    def _chain(first_chunk, reader):
+        """Yield the already-read first chunk followed by the rest of the reader"""
+        yield first_chunk
+        yield from reader
+
+    @staticmethod
+    def _load_infile(conn, path, table_name, columns):
+        """Load the whole file server-side with LOAD DATA LOCAL INFILE (MySQL only)"""
+        variables = [f"@v{i}" for i in range(len(columns))]
+        # Empty CSV fields must become NULL rather than 0 / '', and CRLF files leave a trailing \r
+        assignments = ", ".join(
+            f"`{c}` = NULLIF(TRIM(TRAILING '\\r' FROM {v}), '')" for c, v in zip(columns, variables)
+        )
+        result = conn.execute(text(f"""
+        LOAD DATA LOCAL INFILE :path
+        INTO TABLE `{table_name}`
+        FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+        LINES TERMINATED BY '\\n'
+        IGNORE 1 LINES
+        ({", ".join(variables)})
+        SET {assignments}
+        """), {"path": os.path.abspath(path)})
+        return result.rowcount
+
+    @staticmethod
+    def _report(table_name, rows, start):
+        """Print progress and throughput for the table being loaded"""
+        elapsed = time.perf_counter() - start
+        rate = rows / elapsed if elapsed > 0 else 0.0
+        print(f"  {table_name}: {rows:,} rows, {rate:,.0f} rows/s")
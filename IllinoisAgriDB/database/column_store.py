@@ -0,0 +1,207 @@
+import glob
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+
+# Columnar on-disk copy of the project CSVs: one .npy file per column, partitioned by county and year.
+# Run from the project root to (re)build everything: python -m database.column_store
+
+PROJECT_DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)), "project_data")
+STORE_DIR = os.path.join(PROJECT_DATA, "column_store")
+
+# table -> (source CSV, date columns to parse)
+STORE_TABLES = {
+    "weather": ("weather.csv", ["date"]),
+    "soil": ("soil_condition.csv", ["date"]),
+    "stations": ("station.csv", []),
+}
+
+MANIFEST = "manifest.json"
+# How many times a reader waits for a table whose directory is being swapped in
+SWAP_RETRIES = 50
+
+
+def _source_stamp(path):
+    """Identify a source file version by size and modification time"""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _column_array(series):
+    """Convert a column to a fixed-width NumPy array that np.load can memory-map"""
+    if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+        return np.asarray(series.fillna("").astype(str).to_numpy(), dtype=str)
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series.to_numpy(dtype="datetime64[ns]")
+    return series.to_numpy()
+
+
+class ColumnStore:
+    """
+    Converts weather.csv, soil_condition.csv and station.csv once into
+    per-column .npy files under project_data/column_store/<table>/, split
+    into county=<name>/year=<yyyy>/ partitions when the table has a county.
+
+    Reads memory-map the column files, so only the requested counties, years
+    and columns are ever touched. A table is rebuilt automatically when its
+    source CSV's size or modification time no longer matches the manifest.
+    """
+
+    def __init__(self, data_dir=PROJECT_DATA, store_dir=None):
+        self.data_dir = data_dir
+        self.store_dir = store_dir or os.path.join(data_dir, "column_store")
+
+    def table_dir(self, table):
+        return os.path.join(self.store_dir, table)
+
+    def read_manifest(self, table):
+        """Return the table's manifest, or None if it has not been built"""
+        path = os.path.join(self.table_dir(table), MANIFEST)
+        for _ in range(SWAP_RETRIES):
+            try:
+                with open(path) as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                if not self._swapping(table):
+                    return None
+                # build() is between its two renames; the new directory lands right away
+                time.sleep(0.01)
+        return None
+
+    def _swapping(self, table):
+        """True while a build has moved the live directory aside and not yet removed it"""
+        return bool(glob.glob(glob.escape(self.table_dir(table)) + ".old-*"))
+
+    def is_stale(self, table):
+        """True when the table is missing or its source CSV changed since the last build"""
+        manifest = self.read_manifest(table)
+        source = os.path.join(self.data_dir, STORE_TABLES[table][0])
+        return manifest is None or manifest["source"] != _source_stamp(source)
+
+    def ensure(self, table):
+        """Build the table if needed and return its manifest"""
+        if self.is_stale(table):
+            self.build(table)
+        return self.read_manifest(table)
+
+    def build(self, table):
+        """
+        Convert one source CSV into column files. They are written to a directory unique
+        to this build, then swapped in: the live directory is renamed aside, the new one
+        renamed into place, and the old one deleted, so readers never see a partial table.
+        """
+        filename, date_columns = STORE_TABLES[table]
+        source = os.path.join(self.data_dir, filename)
+        start = time.perf_counter()
+        stamp = _source_stamp(source)
+        df = pd.read_csv(source, parse_dates=date_columns)
+
+        if "county" in df.columns:
+            years = df["date"].dt.year if "date" in df.columns else df["year"]
+            groups = df.groupby([df["county"].fillna(""), years], sort=True)
+        else:
+            groups = [((None, None), df)]
+
+        # Unique per build, so concurrent builds of the same table can't remove each other's files
+        suffix = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        building = f"{self.table_dir(table)}.building-{suffix}"
+        partitions = []
+        for (county, year), part in groups:
+            if county is None:
+                rel = "all"
+            else:
+                rel = os.path.join(f"county={quote(county, safe='')}", f"year={int(year)}")
+            os.makedirs(os.path.join(building, rel))
+            for column in df.columns:
+                np.save(os.path.join(building, rel, f"{column}.npy"), _column_array(part[column]))
+            partitions.append({
+                "county": county,
+                "year": None if year is None else int(year),
+                "path": rel,
+                "rows": len(part)
+            })
+
+        manifest = {
+            "table": table,
+            "source": stamp,
+            "columns": list(df.columns),
+            "partitions": partitions,
+            "built_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        with open(os.path.join(building, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        self._swap_in(table, building, suffix)
+        print(f"Built column store '{table}': {len(df):,} rows in {len(partitions)} partitions "
+              f"({time.perf_counter() - start:.2f}s)")
+        return manifest
+
+    def _swap_in(self, table, building, suffix):
+        """Replace the live table directory with `building`"""
+        live = self.table_dir(table)
+        retired = []
+        try:
+            for attempt in range(SWAP_RETRIES):
+                aside = f"{live}.old-{suffix}-{attempt}"
+                try:
+                    os.replace(live, aside)
+                    retired.append(aside)
+                except FileNotFoundError:
+                    pass
+                try:
+                    os.replace(building, live)
+                    return
+                except OSError:
+                    # Another build landed its directory in between; retire that one too
+                    continue
+            raise RuntimeError(f"Could not swap in the new '{table}' column store")
+        finally:
+            for path in retired:
+                shutil.rmtree(path, ignore_errors=True)
+            shutil.rmtree(building, ignore_errors=True)
+
+    def scan(self, table, counties=None, years=None, columns=None):
+        """
+        Yield {column: memory-mapped array} for every matching partition.
+        Nothing is copied; arrays are read-only views of the column files.
+        """
+        manifest = self.ensure(table)
+        columns = columns or manifest["columns"]
+        missing = set(columns) - set(manifest["columns"])
+        if missing:
+            raise KeyError(f"Columns not in '{table}': {sorted(missing)}")
+        counties = None if counties is None else set(counties)
+        years = None if years is None else set(years)
+
+        for part in manifest["partitions"]:
+            if counties is not None and part["county"] is not None and part["county"] not in counties:
+                continue
+            if years is not None and part["year"] is not None and part["year"] not in years:
+                continue
+            base = os.path.join(self.table_dir(table), part["path"])
+            yield {c: np.load(os.path.join(base, f"{c}.npy"), mmap_mode="r") for c in columns}
+
+    def load(self, table, counties=None, years=None, columns=None):
+        """Load the matching partitions and columns into one DataFrame"""
+        manifest = self.ensure(table)
+        columns = columns or manifest["columns"]
+        try:
+            parts = list(self.scan(table, counties, years, columns))
+        except FileNotFoundError:
+            # The table was swapped for a new build while its partitions were being opened
+            parts = list(self.scan(table, counties, years, columns))
+        if not parts:
+            return pd.DataFrame({c: [] for c in columns})
+        return pd.DataFrame({c: np.concatenate([p[c] for p in parts]) for c in columns})
+
+
+if __name__ == "__main__":
+    store = ColumnStore()
+    for name in (sys.argv[1:] or STORE_TABLES):
+        store.build(name)
@@ -0,0 +1,107 @@
+from sqlalchemy import text, inspect
+
+# stations.location holds a comma-separated list of counties ("St.Clair, Monroe, Madison").
+# This module is the one place that splits it: into the normalized station_counties table
+# at ingest time, and into an in-memory county <-> station index for lookups.
+
+
+def split_location(location):
+    """
+    Split a stations.location string into its counties,
+    e.g. "St.Clair, Monroe, Madison" -> ["St.Clair", "Monroe", "Madison"]
+    """
+    if not isinstance(location, str):
+        return []
+    return [county.strip() for county in location.split(",") if county.strip()]
+
+
+class CountyIndex:
+    """
+    In-memory inverted index between counties (the app's "regions") and stations,
+    built from the normalized station_counties table. All lookups are dict reads.
+    """
+
+    def __init__(self):
+        self.county_stations = {}   # county -> [station names], in stations table order
+        self.station_counties = {}  # station name -> [counties], in location string order
+        self.version = None         # data version the index was built from
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (county, station_name) pairs"""
+        index = cls()
+        for county, station in rows:
+            stations = index.county_stations.setdefault(county, [])
+            if station not in stations:
+                stations.append(station)
+            counties = index.station_counties.setdefault(station, [])
+            if county not in counties:
+                counties.append(county)
+        return index
+
+    @classmethod
+    def from_locations(cls, stations):
+        """Build from (station_name, location) pairs, splitting each location string"""
+        return cls.from_rows(
+            (county, name) for name, location in stations for county in split_location(location)
+        )
+
+    @classmethod
+    def build(cls, db):
+        """Load the index from station_counties, or from stations if that table is not there yet"""
+        tables = inspect(db.connect()).get_table_names()
+        if "station_counties" in tables:
+            rows = db.fetch_rows("SELECT county, station_name FROM station_counties ORDER BY station_name, position")
+            return cls.from_rows(rows or [])
+        if "stations" not in tables:
+            return cls()
+        stations = db.fetch_rows("SELECT station_name, location FROM stations")
+        return cls.from_locations(stations or [])
+
+    def regions(self):
+        """Every county that has at least one station, sorted"""
+        return sorted(self.county_stations)
+
+    def stations_for(self, county):
+        return self.county_stations.get(county, [])
+
+    def counties_for(self, station):
+        return self.station_counties.get(station, [])
+
+
+def refresh_station_counties(engine):
+    """
+    Rebuild the normalized station_counties table (one row per station and county)
+    from stations.location, with indexes for county -> station and station -> county.
+    Returns the number of rows written.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS station_counties (
+            county VARCHAR(64) NOT NULL,
+            station_name VARCHAR(64) NOT NULL,
+            position INT NOT NULL,
+            PRIMARY KEY (county, station_name)
+        )
+        """))
+    indexes = {i["name"] for i in inspect(engine).get_indexes("station_counties")}
+    with engine.begin() as conn:
+        if "idx_station_counties_station" not in indexes:
+            conn.execute(text("CREATE INDEX idx_station_counties_station ON station_counties (station_name, county)"))
+
+        stations = conn.execute(text("SELECT station_name, location FROM stations")).fetchall()
+        rows, seen = [], set()
+        for name, location in stations:
+            for position, county in enumerate(split_location(location)):
+                if (county, name) not in seen:
+                    seen.add((county, name))
+                    rows.append({"county": county, "station_name": name, "position": position})
+
+        conn.execute(text("DELETE FROM station_counties"))
+        if rows:
+            conn.execute(text("""
+            INSERT INTO station_counties (county, station_name, position)
+            VALUES (:county, :station_name, :position)
+            """), rows)
+    print(f"Table 'station_counties' has {len(rows)} (county, station) rows.")
+    return len(rows)
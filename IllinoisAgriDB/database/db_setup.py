@@ -1,23 +1,117 @@
 import pandas as pd
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import text, inspect
 from dotenv import load_dotenv
 import os
+import time
+import json
+import hashlib
+import datetime
+from contextlib import contextmanager
 import pymysql
+import numpy as np
+from database.sampling import SamplingIndex
+from database.counties import CountyIndex, refresh_station_counties
+from database.bulk_loader import BulkLoader, DEFAULT_CHUNK_SIZE
+from database.rollups import Rollups, ROLLUPS, ROLLUP_REPORTS
+from database.anomalies import AnomalyService, ANOMALY_MEASURES
+from database.reports import REPORT_QUERIES
+from database.analytics import AnalyticsEngine
+from database.dialect import make_engine, translate, upsert_clause
+from database.pool import PoolMetrics, pool_config
 
 # Load environment variables
 load_dotenv()
 
+# Map CSV files to table names
+CSV_TABLE_MAP = {
+    "user.csv": "users",
+    "crop_and_planning.csv": "crops_planning",
+    "station.csv": "stations",
+    "weather.csv": "weather",
+    "soil_condition.csv": "soil"
+}
+
+# (table, station column) pairs that get a typed obs_date column and a (station, obs_date) index
+DATED_TABLES = [("weather", "station"), ("soil", "station")]
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "project_data")
+
+# Where the analysis reports are computed: "sql" scans the raw tables, "rollup" reads the
+# monthly rollup tables, "local" runs the pandas engine in-process (no database needed)
+REPORT_ENGINES = ("sql", "rollup", "local")
+
+# Bump when migrate_schema or the rollup tables change, so `init` knows to re-run them
+# (2: station_counties, 3: anomaly norms)
+SCHEMA_VERSION = 3
+
+# How each backend builds obs_date from the year/month/day columns
+OBS_DATE_SQL = {
+    "mysql": "STR_TO_DATE(CONCAT(year, '-', LPAD(month, 2, '0'), '-', LPAD(day, 2, '0')), '%Y-%m-%d')",
+    "sqlite": "printf('%04d-%02d-%02d', year, month, day)"
+}
+
+
+@contextmanager
+def timed(timings, phase):
+    """Record how long the block took in timings[phase]"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = round(time.perf_counter() - start, 4)
+
+
+def is_text(column_type):
+    """True for TEXT-family column types (TEXT, MEDIUMTEXT, LONGTEXT, ...), which MySQL can't fully index"""
+    return column_type is not None and "text" in column_type.__visit_name__.lower()
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 class DatabaseConnection:
-    def __init__(self):
+    def __init__(self, **pool_options):
         self.user = os.getenv("DB_USER")
         self.password = os.getenv("DB_PASSWORD")
         self.host = os.getenv("DB_HOST")
         self.port = os.getenv("DB_PORT")
         self.database = os.getenv("DB_NAME")
+        # "mysql" (server from the settings above) or "sqlite" (embedded file at DB_PATH)
+        self.backend = os.getenv("DB_BACKEND", "mysql")
+        self.db_path = os.getenv("DB_PATH", os.path.join(DATA_PATH, "agri.db"))
+        # Pool settings (pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping,
+        # connect_timeout) from keyword arguments, else DB_POOL_* environment variables
+        self.pool_options = pool_config(**pool_options)
+        self.pool_metrics = PoolMetrics()
         self.engine = None
+        self.meta = None
+        self.meta_read_at = 0.0
+        # How long a data version read from app_meta is trusted before re-reading it
+        self.version_ttl = float(os.getenv("DB_VERSION_TTL", "30"))
+        # Results that only change when data is loaded (e.g. /api/regions), keyed by name
+        self.reference_cache = {}
+        self.startup_timings = {}
+        self.sampling_index = None
+        self.county_index = None
+        # Bulk load settings: rows per chunk and "executemany" or "infile" (LOAD DATA LOCAL INFILE)
+        self.load_chunk_size = int(os.getenv("DB_LOAD_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+        self.load_method = os.getenv("DB_LOAD_METHOD", "executemany")
+        # Report engine used unless a report has its own entry in report_engines
+        self.report_engine = os.getenv("DB_REPORT_ENGINE", "rollup")
+        self.report_engines = {}
+        self.analytics = None
         
     def create_database(self):
         """Create the database if it doesn't exist"""
+        if self.backend == "sqlite":
+            # SQLite creates the file on first connect; only the folder has to exist
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            print(f"Using SQLite database '{self.db_path}'.")
+            return True
         try:
             # Connect without specifying a database
             conn = pymysql.connect(
@@ -38,68 +132,440 @@ class DatabaseConnection:
             print(f"Error creating database: {str(e)}")
             return False
 
+    def create_engine(self):
+        """Create the SQLAlchemy engine; no connection is opened until the first query"""
+        if not self.engine:
+            connection_string = f"mysql+pymysql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}"
+            self.engine = make_engine(self.backend, url=connection_string, path=self.db_path, pool=self.pool_options)
+        return self.engine
+
     def connect(self):
-        """Create database connection"""
+        """Create database connection, running the full `init` checks the first time"""
         if not self.engine:
+            self.init()
+        return self.engine
+
+    def init(self):
+        """
+        Full setup: create the database, load the CSVs if the tables are missing or
+        empty, and bring the schema and rollups up to SCHEMA_VERSION. Run it once per
+        deployment (python -m database.db_setup init); startup() then only reads app_meta.
+        """
+        timings = {}
+        with timed(timings, "create_database"):
             # First ensure the database exists
             self.create_database()
-            
-            connection_string = f"mysql+pymysql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}"
-            self.engine = create_engine(connection_string)
-            
-            # Check if tables exist and have data
-            try:
-                inspector = inspect(self.engine)
-                if "stations" not in inspector.get_table_names():
-                    print("Tables not found. Loading data...")
-                    self.load_data()
-                else:
-                    # Check if stations table has data
+        with timed(timings, "engine"):
+            self.create_engine()
+
+        # Check if tables exist and have data
+        try:
+            with timed(timings, "inspect"):
+                tables = inspect(self.engine).get_table_names()
+                count = 0
+                if "stations" in tables:
                     with self.engine.connect() as conn:
-                        result = conn.execute(text("SELECT COUNT(*) FROM stations"))
-                        count = result.scalar()
-                        if count == 0:
-                            print("Tables exist but no data found. Loading data...")
-                            self.load_data()
-            except Exception as e:
-                print(f"Error checking tables: {str(e)}")
-                
+                        count = conn.execute(text("SELECT COUNT(*) FROM stations")).scalar()
+
+            if "stations" not in tables or count == 0:
+                print("Tables not found or empty. Loading data...")
+                with timed(timings, "load_data"):
+                    self.load_data()
+            else:
+                with timed(timings, "read_meta"):
+                    meta = self.read_meta()
+                if meta is None or meta["schema_version"] != SCHEMA_VERSION:
+                    print(f"Schema is not at version {SCHEMA_VERSION}. Migrating...")
+                    with timed(timings, "migrate"):
+                        self.migrate_schema()
+                        self.refresh_station_counties()
+                        self.refresh_rollups()
+                        self.refresh_anomaly_norms()
+                        self.write_meta()
+        except Exception as e:
+            print(f"Error checking tables: {str(e)}")
+
+        self.startup_timings = timings
+        self.report_timings("Init")
         return self.engine
 
-    def load_data(self):
-        """Load CSV data into MySQL database"""
-        base_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "project_data")
-        
-        # Map CSV files to table names
-        csv_table_map = {
-            "user.csv": "users",
-            "crop_and_planning.csv": "crops_planning",
-            "station.csv": "stations",
-            "weather.csv": "weather",
-            "soil_condition.csv": "soil"
-        }
+    def startup(self):
+        """
+        Cheap startup for the web app: create the engine and read the single app_meta
+        row, nothing else. Heavy checks and loading are left to `init`, unless
+        DB_AUTO_INIT=1 asks for them when the database is not initialized yet.
+        """
+        timings = {}
+        with timed(timings, "engine"):
+            self.create_engine()
+        with timed(timings, "read_meta"):
+            meta = self.read_meta()
+        self.startup_timings = timings
+
+        if meta is None or meta["schema_version"] != SCHEMA_VERSION:
+            if os.getenv("DB_AUTO_INIT", "0") == "1":
+                return self.init()
+            print(f"Database is not initialized for schema version {SCHEMA_VERSION}; "
+                  f"run `python -m database.db_setup init`.")
+        self.report_timings("Startup")
+        return self.engine
+
+    def report_timings(self, label):
+        """Print the time spent in each startup phase"""
+        phases = ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in self.startup_timings.items())
+        total = sum(self.startup_timings.values())
+        status = ""
+        if self.meta is not None:
+            status = f" (schema v{self.meta['schema_version']}, data loaded {self.meta['loaded_at']})"
+        print(f"{label}: {phases}; total {total:.3f}s{status}")
+
+    def read_meta(self):
+        """Return the app_meta row {schema_version, loaded_at}, or None if there is none yet"""
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(text(
+                    "SELECT schema_version, loaded_at FROM app_meta WHERE id = 1"
+                )).mappings().first()
+        except Exception:
+            # A fresh database has no app_meta table yet
+            row = None
+        self.meta = dict(row) if row is not None else None
+        self.meta_read_at = time.monotonic()
+        return self.meta
+
+    def data_version(self):
+        """
+        Stamp that changes whenever data is (re)loaded: schema version + loaded_at from
+        app_meta. Re-read at most every version_ttl seconds, so loads done by another
+        process are noticed without a query per request.
+        """
+        if self.engine is not None and time.monotonic() - self.meta_read_at > self.version_ttl:
+            self.read_meta()
+        if self.meta is None:
+            return "uninitialized"
+        return f"v{self.meta['schema_version']}-{self.meta['loaded_at']}"
+
+    def cached_reference(self, name, compute):
+        """
+        Return {"version", "value", "etag"} for a reference result, recomputing it with
+        compute() only when the data version changed. The etag is a hash of the value.
+        A None result (query error) is not cached and returns None.
+        """
+        version = self.data_version()
+        entry = self.reference_cache.get(name)
+        if entry is None or entry["version"] != version:
+            value = compute()
+            if value is None:
+                return None
+            etag = hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+            entry = {"version": version, "value": value, "etag": etag}
+            self.reference_cache[name] = entry
+        return entry
+
+    def write_meta(self, data_loaded=False):
+        """
+        Store the current schema version; data_loaded=True also stamps loaded_at with now
+        and drops this process's cached reference results
+        """
+        if data_loaded:
+            self.reference_cache.clear()
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS app_meta (
+                id INT PRIMARY KEY,
+                schema_version INT NOT NULL,
+                loaded_at DATETIME
+            )
+            """))
+        previous = self.read_meta()
+        loaded_at = datetime.datetime.now().replace(microsecond=0)
+        if not data_loaded and previous is not None and previous["loaded_at"] is not None:
+            loaded_at = previous["loaded_at"]
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+            INSERT INTO app_meta (id, schema_version, loaded_at)
+            VALUES (1, :schema_version, :loaded_at)
+            {upsert_clause(conn.dialect, ["schema_version", "loaded_at"])}
+            """), {"schema_version": SCHEMA_VERSION, "loaded_at": loaded_at})
+        return self.read_meta()
+
+    def load_data(self, chunk_size=None, method=None):
+        """Stream CSV data into the database in chunks, one transaction per table"""
+        base_path = DATA_PATH
+        csv_table_map = CSV_TABLE_MAP
 
         try:
             engine = self.connect()
+            loader = BulkLoader(
+                engine,
+                chunk_size=chunk_size or self.load_chunk_size,
+                method=method or self.load_method
+            )
             
+            total_rows, total_seconds = 0, 0.0
             for filename, table_name in csv_table_map.items():
                 full_path = os.path.join(base_path, filename)
                 print(f"Loading {filename} into table '{table_name}'")
                 
                 if os.path.exists(full_path):
-                    df = pd.read_csv(full_path)
-                    df.to_sql(table_name, con=engine, if_exists="replace", index=False)
+                    stats = loader.load_csv(full_path, table_name)
+                    total_rows += stats["rows"]
+                    total_seconds += stats["seconds"]
                 else:
                     print(f"Warning: File {filename} not found in {base_path}")
 
-            print("All tables loaded into MySQL database!")
+            rate = total_rows / total_seconds if total_seconds > 0 else 0.0
+            print(f"All tables loaded into the {self.backend} database! {total_rows:,} rows in {total_seconds:.2f}s ({rate:,.0f} rows/s)")
             
             # Preview the loaded data
             self.preview_tables(csv_table_map.values())
+
+            # to_sql creates untyped, unindexed tables, so add the date column and keys
+            self.migrate_schema()
+
+            # One (county, station) row per county in each stations.location
+            self.refresh_station_counties()
+
+            # Everything was replaced, so rebuild the monthly rollups from scratch
+            self.refresh_rollups()
+
+            # History is not scored; the anomaly norms just start from all of it
+            self.refresh_anomaly_norms()
+
+            # Remember what was loaded so the next incremental ingest can skip it
+            for filename, table_name in csv_table_map.items():
+                full_path = os.path.join(base_path, filename)
+                if os.path.exists(full_path):
+                    self.record_ingest(filename, table_name, file_hash(full_path))
+
+            # One row that tells later startups the data and schema are in place
+            self.write_meta(data_loaded=True)
+
+            # The data changed, so the random (station, date) sampler must be rebuilt;
+            # other processes notice the new data version and rebuild theirs
+            self.refresh_sampling_index()
             
         except Exception as e:
             print(f"Error loading data: {str(e)}")
 
+    def ensure_ingest_tables(self):
+        """Create the bookkeeping tables used by incremental ingest"""
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS ingest_files (
+                file_name VARCHAR(255) PRIMARY KEY,
+                table_name VARCHAR(64) NOT NULL,
+                content_hash CHAR(64) NOT NULL,
+                ingested_at DATETIME NOT NULL
+            )
+            """))
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS ingest_watermarks (
+                table_name VARCHAR(64) NOT NULL,
+                station VARCHAR(64) NOT NULL,
+                max_date DATE NOT NULL,
+                PRIMARY KEY (table_name, station)
+            )
+            """))
+
+    def record_ingest(self, filename, table_name, content_hash):
+        """Store a file's content hash and, for dated tables, the per-station high-water marks"""
+        self.ensure_ingest_tables()
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+            INSERT INTO ingest_files (file_name, table_name, content_hash, ingested_at)
+            VALUES (:file_name, :table_name, :content_hash, :ingested_at)
+            {upsert_clause(conn.dialect, ["table_name", "content_hash", "ingested_at"])}
+            """), {
+                "file_name": filename,
+                "table_name": table_name,
+                "content_hash": content_hash,
+                "ingested_at": datetime.datetime.now()
+            })
+            for dated_table, station_col in DATED_TABLES:
+                if dated_table != table_name:
+                    continue
+                conn.execute(text("""
+                DELETE FROM ingest_watermarks WHERE table_name = :table_name
+                """), {"table_name": table_name})
+                # Served by the (station, obs_date) index, no full scan
+                conn.execute(text(f"""
+                INSERT INTO ingest_watermarks (table_name, station, max_date)
+                SELECT :table_name, {station_col}, MAX(obs_date)
+                FROM {table_name}
+                WHERE obs_date IS NOT NULL
+                GROUP BY {station_col}
+                """), {"table_name": table_name})
+
+    def read_watermarks(self, table_name):
+        """Return {station: max obs_date} recorded for a table, computing it if none was recorded"""
+        result = self.execute_query(
+            "SELECT station, max_date FROM ingest_watermarks WHERE table_name = :table_name",
+            {"table_name": table_name}
+        )
+        if result is None or result.empty:
+            station_col = dict(DATED_TABLES)[table_name]
+            result = self.execute_query(f"""
+            SELECT {station_col} AS station, MAX(obs_date) AS max_date
+            FROM {table_name}
+            GROUP BY {station_col}
+            """)
+        if result is None or result.empty:
+            return {}
+        return dict(zip(result["station"], pd.to_datetime(result["max_date"])))
+
+    def ingest_incremental(self, chunk_size=None):
+        """
+        Refresh the database from the CSVs without reloading history.
+        Files whose content hash is unchanged since the last run are skipped. For weather
+        and soil only rows newer than each station's high-water mark are upserted
+        (INSERT ... ON DUPLICATE KEY UPDATE on the (station, obs_date) key); the small
+        reference tables are reloaded when they change.
+        Returns {table: set of touched (station, year, month)} for the dated tables.
+        """
+        engine = self.connect()
+        self.ensure_ingest_tables()
+        loader = BulkLoader(engine, chunk_size=chunk_size or self.load_chunk_size, method="executemany")
+        dated = dict(DATED_TABLES)
+        tables = inspect(engine).get_table_names()
+
+        known = self.execute_query("SELECT file_name, content_hash FROM ingest_files")
+        known_hashes = {} if known is None else dict(zip(known["file_name"], known["content_hash"]))
+
+        touched = {}
+        new_weather = []
+        changed = False
+        reloaded_dated = False
+        for filename, table_name in CSV_TABLE_MAP.items():
+            full_path = os.path.join(DATA_PATH, filename)
+            if not os.path.exists(full_path):
+                print(f"Warning: File {filename} not found in {DATA_PATH}")
+                continue
+
+            content_hash = file_hash(full_path)
+            if known_hashes.get(filename) == content_hash:
+                print(f"Skipping {filename}: unchanged since last ingest")
+                continue
+
+            changed = True
+            if table_name not in dated or table_name not in tables:
+                # Reference tables are tiny, and a missing table needs a full load anyway
+                print(f"Reloading {filename} into table '{table_name}'")
+                loader.load_csv(full_path, table_name)
+                if table_name in dated or table_name == "stations":
+                    # Only the reloaded table needs its keys and indexes again
+                    self.migrate_schema(only=[table_name])
+                if table_name == "stations":
+                    self.refresh_station_counties()
+                reloaded_dated = reloaded_dated or table_name in dated
+            else:
+                station_col = dated[table_name]
+                watermarks = self.read_watermarks(table_name)
+                table_columns = [c["name"] for c in inspect(engine).get_columns(table_name)]
+                table_touched = set()
+
+                def newer_rows(chunk, station_col=station_col, watermarks=watermarks,
+                               table_columns=table_columns, table_touched=table_touched, table_name=table_name):
+                    obs_date = pd.to_datetime(chunk[["year", "month", "day"]])
+                    marks = pd.to_datetime(chunk[station_col].map(watermarks))
+                    chunk = chunk[marks.isna() | (obs_date > marks)].copy()
+                    chunk["obs_date"] = obs_date[chunk.index].dt.date
+                    for column in table_columns:
+                        if column not in chunk.columns:
+                            chunk[column] = None
+                    table_touched.update(zip(chunk[station_col], chunk["year"], chunk["month"]))
+                    if table_name == "weather":
+                        # Kept for anomaly scoring once the upsert has committed
+                        new_weather.extend(zip(
+                            chunk[station_col], chunk["obs_date"], *(chunk[c] for c in ANOMALY_MEASURES.values())
+                        ))
+                    return chunk
+
+                print(f"Upserting new rows from {filename} into table '{table_name}'")
+                loader.upsert_csv(full_path, table_name, table_columns, prepare=newer_rows)
+                touched[table_name] = table_touched
+
+            self.record_ingest(filename, table_name, content_hash)
+
+        if changed:
+            # Only the months that received rows need their rollups recomputed
+            if reloaded_dated:
+                self.refresh_rollups()
+            elif any(touched.values()):
+                self.refresh_rollups(touched)
+            if reloaded_dated:
+                self.refresh_anomaly_norms()
+            elif new_weather:
+                self.score_anomalies(new_weather)
+            self.write_meta(data_loaded=True)
+            self.refresh_sampling_index()
+        else:
+            print("No changed files to ingest.")
+        return touched
+
+    def migrate_schema(self, only=None):
+        """
+        Add a typed obs_date column and (station, obs_date) indexes to weather and soil,
+        and a covering index on stations.location, so date filters and joins can use
+        index range scans. Safe to run repeatedly: columns and indexes that are already
+        in place are left alone. `only` limits the migration to the given table names.
+        """
+        try:
+            dialect = self.engine.dialect.name
+            inspector = inspect(self.engine)
+            tables = inspector.get_table_names()
+            if only is not None:
+                tables = [t for t in tables if t in only]
+            # MySQL commits DDL implicitly, so run each statement on its own
+            with self.engine.execution_options(isolation_level="AUTOCOMMIT").connect() as conn:
+                for table, station_col in DATED_TABLES:
+                    if table not in tables:
+                        continue
+                    column_types = {c["name"]: c["type"] for c in inspector.get_columns(table)}
+                    columns = set(column_types)
+                    indexes = {i["name"] for i in inspector.get_indexes(table)}
+
+                    # to_sql stores strings as TEXT, which MySQL can only index by prefix.
+                    # MODIFY rebuilds the table, so only run it while the column is still TEXT.
+                    if dialect == "mysql" and is_text(column_types.get(station_col)):
+                        conn.execute(text(f"ALTER TABLE {table} MODIFY {station_col} VARCHAR(64)"))
+                    if "obs_date" not in columns:
+                        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN obs_date DATE"))
+                    conn.execute(text(f"""
+                    UPDATE {table}
+                    SET obs_date = {OBS_DATE_SQL.get(dialect, OBS_DATE_SQL["mysql"])}
+                    WHERE obs_date IS NULL
+                    """))
+
+                    if f"uq_{table}_station_date" not in indexes and f"idx_{table}_station_date" not in indexes:
+                        try:
+                            conn.execute(text(
+                                f"CREATE UNIQUE INDEX uq_{table}_station_date ON {table} ({station_col}, obs_date)"
+                            ))
+                        except Exception as e:
+                            # Duplicate (station, date) rows in the source data; fall back to a plain index
+                            print(f"Could not add unique key on {table}: {str(e)}")
+                            conn.execute(text(
+                                f"CREATE INDEX idx_{table}_station_date ON {table} ({station_col}, obs_date)"
+                            ))
+                    print(f"Table '{table}' has obs_date and a ({station_col}, obs_date) index.")
+
+                if "stations" in tables:
+                    indexes = {i["name"] for i in inspector.get_indexes("stations")}
+                    column_types = {c["name"]: c["type"] for c in inspector.get_columns("stations")}
+                    if dialect == "mysql" and any(
+                        is_text(column_types.get(c)) for c in ("station_name", "location")
+                    ):
+                        conn.execute(text("ALTER TABLE stations MODIFY station_name VARCHAR(64), MODIFY location VARCHAR(255)"))
+                    if "idx_stations_location" not in indexes:
+                        # Covers SELECT DISTINCT location and location -> station_name lookups
+                        conn.execute(text("CREATE INDEX idx_stations_location ON stations (location, station_name)"))
+                    print("Table 'stations' has a covering index on location.")
+            return True
+        except Exception as e:
+            print(f"Error migrating schema: {str(e)}")
+            return False
+
     def preview_tables(self, table_names):
         """Preview the first 3 rows of each table"""
         try:
@@ -111,16 +577,185 @@ class DatabaseConnection:
         except Exception as e:
             print(f"Error previewing tables: {str(e)}")
 
+    def refresh_rollups(self, touched=None):
+        """
+        Recompute the monthly rollup tables behind the reports: all of them, or only the
+        (station, year, month) rows in `touched` ({table: set of keys} from ingest_incremental)
+        """
+        try:
+            return Rollups(self.connect()).refresh(touched)
+        except Exception as e:
+            print(f"Error refreshing rollups: {str(e)}")
+            return None
+
+    def refresh_anomaly_norms(self):
+        """Recompute the per (station, month) anomaly norms from the weather rollup"""
+        try:
+            return AnomalyService(self.connect()).rebuild()
+        except Exception as e:
+            print(f"Error rebuilding anomaly norms: {str(e)}")
+            return None
+
+    def score_anomalies(self, rows):
+        """
+        Score newly ingested weather days, (station, obs_date, avg_air_temp, precip),
+        against the running norms and flag outliers. Returns the flagged days.
+        """
+        try:
+            if "anomaly_norms" not in inspect(self.engine).get_table_names():
+                # No norms yet (database from before they existed): start them from everything
+                self.refresh_anomaly_norms()
+                return []
+            return AnomalyService(self.engine).score(rows)
+        except Exception as e:
+            print(f"Error scoring anomalies: {str(e)}")
+            return None
+
+    def set_report_engine(self, engine, report=None):
+        """Choose "sql", "rollup" or "local" for one report, or for all reports when report is None"""
+        if engine not in REPORT_ENGINES:
+            raise ValueError(f"Unknown report engine '{engine}', expected one of {REPORT_ENGINES}")
+        if report is None:
+            self.report_engine = engine
+            self.report_engines.clear()
+        else:
+            self.report_engines[report] = engine
+
+    def run_report(self, name, engine=None):
+        """Compute one of the analysis reports (see database/reports.py) as a DataFrame"""
+        engine = engine or self.report_engines.get(name, self.report_engine)
+        if engine == "local":
+            try:
+                if self.analytics is None:
+                    self.analytics = AnalyticsEngine(DATA_PATH)
+                return self.analytics.run(name)
+            except Exception as e:
+                print(f"Error computing {name} in-process: {str(e)}")
+                return None
+
+        self.connect()
+        if engine == "rollup":
+            # Databases loaded before the rollups existed get them built on first use
+            if not set(ROLLUPS) <= set(inspect(self.engine).get_table_names()):
+                self.refresh_rollups()
+            return self.execute_query(ROLLUP_REPORTS[name])
+        return self.execute_query(REPORT_QUERIES[name])
+
+    def refresh_station_counties(self):
+        """Rebuild the station_counties table and the in-memory county index from stations"""
+        try:
+            refresh_station_counties(self.engine)
+            # Loaded again by get_county_index once the new data version is written
+            self.county_index = None
+            return True
+        except Exception as e:
+            print(f"Error building station_counties: {str(e)}")
+            self.county_index = None
+            return False
+
+    def get_county_index(self):
+        """Return the county <-> station index, reloading it when the data version changes"""
+        version = self.data_version()
+        if self.county_index is None or self.county_index.version != version:
+            self.county_index = CountyIndex.build(self)
+            self.county_index.version = version
+        return self.county_index
+
+    def refresh_sampling_index(self):
+        """Rebuild the in-memory (station, date) sampling index from the loaded tables"""
+        version = self.data_version()
+        try:
+            self.sampling_index = SamplingIndex.build(self)
+        except Exception as e:
+            print(f"Error building sampling index: {str(e)}")
+            self.sampling_index = SamplingIndex()
+        self.sampling_index.version = version
+        return self.sampling_index
+
+    def get_sampling_index(self):
+        """
+        Return the sampling index, building it on first use and again when the data
+        version changes (e.g. after a load or ingest run by another process)
+        """
+        if self.sampling_index is None or self.sampling_index.version != self.data_version():
+            self.refresh_sampling_index()
+        return self.sampling_index
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out of the pool, recording the wait and how many are in use"""
+        start = time.perf_counter()
+        with self.engine.connect() as conn:
+            self.pool_metrics.record_checkout(time.perf_counter() - start, self.pool_in_use())
+            yield conn
+
+    def pool_in_use(self):
+        """Connections currently checked out of the pool"""
+        pool = self.engine.pool if self.engine is not None else None
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+    def pool_status(self):
+        """Pool settings, live pool state and checkout metrics"""
+        stats = self.pool_metrics.snapshot(self.engine.pool if self.engine is not None else None)
+        stats["config"] = self.pool_options
+        return stats
+
+    def fetch_rows(self, query, params=None):
+        """
+        Run a small query and return its rows as plain tuples, skipping DataFrame
+        construction (for point lookups). Returns None on error, like execute_query.
+        """
+        try:
+            with self.connection() as conn:
+                result = conn.execute(text(translate(query, conn.dialect.name)), params or {})
+                return [tuple(row) for row in result]
+        except Exception as e:
+            self.pool_metrics.record_error()
+            print(f"Error executing query: {str(e)}")
+            return None
+
+    def stream_rows(self, query, params=None, batch_size=1000):
+        """
+        Yield a query's rows as tuples from a server-side cursor, fetching batch_size
+        rows at a time, so large results are never held in memory. The connection stays
+        checked out until the generator is exhausted or closed. Errors are raised.
+        """
+        try:
+            with self.connection() as conn:
+                result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+                    text(translate(query, conn.dialect.name)), params or {}
+                )
+                for row in result:
+                    yield tuple(row)
+        except Exception:
+            self.pool_metrics.record_error()
+            raise
+
+    def fetch_one(self, query, params=None):
+        """First row of a query as a tuple, or None when there are no rows (or on error)"""
+        rows = self.fetch_rows(query, params)
+        return rows[0] if rows else None
+
+    def fetch_array(self, query, params=None, dtype=np.float64):
+        """Numeric query results as a 2-D NumPy array (rows x columns), or None on error"""
+        rows = self.fetch_rows(query, params)
+        if rows is None:
+            return None
+        return np.array(rows, dtype=dtype).reshape(len(rows), -1)
+
     def execute_query(self, query, params=None):
         """Execute a SQL query and return results as a DataFrame"""
         try:
-            with self.engine.connect() as conn:
+            with self.connection() as conn:
+                # MySQL-only functions are rewritten when running on the embedded backend
+                query = translate(query, conn.dialect.name)
                 if params:
                     result = pd.read_sql(text(query), conn, params=params)
                 else:
                     result = pd.read_sql(text(query), conn)
                 return result
         except Exception as e:
+            self.pool_metrics.record_error()
             print(f"Error executing query: {str(e)}")
             return None
 
@@ -128,6 +763,12 @@ class DatabaseConnection:
 if __name__ == "__main__":
     # Initialize database connection
     db = DatabaseConnection()
+
+    # `python -m database.db_setup init` runs the full setup once and exits
+    from sys import argv
+    if len(argv) > 1 and argv[1] == "init":
+        db.init()
+        raise SystemExit(0)
     
     # Connect will create the database and load data if needed
     db.connect()
@@ -137,12 +778,12 @@ if __name__ == "__main__":
     SELECT 
         s.station_name,
         s.location,
-        COUNT(w.day) as weather_records,
-        AVG(w.avg_air_temperature) as avg_temp
+        COUNT(w.obs_date) as weather_records,
+        AVG(w.avg_air_temp) as avg_temp
     FROM 
         stations s
     JOIN 
-        weather w ON s.station_name = w.station_name
+        weather w ON s.station_name = w.station
     GROUP BY 
         s.station_name, s.location
     LIMIT 5;
@@ -0,0 +1,138 @@
+import re
+import math
+import random
+import datetime
+from sqlalchemy import create_engine, event
+
+# Backends DatabaseConnection can run on. The SQL in this project is written for MySQL;
+# on SQLite the few MySQL-only functions it uses are either rewritten to native SQLite
+# (translate) or provided as Python functions registered on every connection.
+BACKENDS = ("mysql", "sqlite")
+
+# DATE_FORMAT(col, '%Y-%m') -> strftime('%Y-%m', col); MySQL and strftime share %Y %m %d
+DATE_FORMAT = re.compile(r"DATE_FORMAT\(\s*([\w.]+)\s*,\s*('[^']*')\s*\)", re.IGNORECASE)
+RAND = re.compile(r"\bRAND\(\s*\)", re.IGNORECASE)
+
+
+def translate(query, dialect_name):
+    """Rewrite MySQL-only SQL for the given dialect; MySQL queries pass through unchanged"""
+    if dialect_name != "sqlite":
+        return query
+    query = RAND.sub("RANDOM()", query)
+    return DATE_FORMAT.sub(r"strftime(\2, \1)", query)
+
+
+def upsert_clause(dialect, columns):
+    """
+    Suffix for an INSERT that updates `columns` when the row hits a unique key:
+    ON DUPLICATE KEY UPDATE on MySQL, ON CONFLICT DO UPDATE on SQLite
+    """
+    quote = dialect.identifier_preparer.quote
+    if dialect.name == "sqlite":
+        updates = ", ".join(f"{quote(c)} = excluded.{quote(c)}" for c in columns)
+        return f"ON CONFLICT DO UPDATE SET {updates}"
+    updates = ", ".join(f"{quote(c)} = VALUES({quote(c)})" for c in columns)
+    return f"ON DUPLICATE KEY UPDATE {updates}"
+
+
+def _date(value):
+    """Dates come back from SQLite as 'YYYY-MM-DD[ HH:MM:SS]' text"""
+    if value is None:
+        return None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _concat(*args):
+    return None if any(a is None for a in args) else "".join(str(a) for a in args)
+
+
+def _lpad(value, width, pad):
+    if value is None:
+        return None
+    value = str(value)
+    return value[:width] if len(value) >= width else (pad * width)[:width - len(value)] + value
+
+
+def _str_to_date(value, fmt):
+    try:
+        return datetime.datetime.strptime(str(value), fmt).date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def _date_format(value, fmt):
+    day = _date(value)
+    return None if day is None else day.strftime(fmt)
+
+
+def _makedate(year, day_of_year):
+    if year is None or day_of_year is None or day_of_year < 1:
+        return None
+    return (datetime.date(int(year), 1, 1) + datetime.timedelta(days=int(day_of_year) - 1)).isoformat()
+
+
+class _StdDev:
+    """STDDEV() aggregate: population standard deviation, NULLs ignored (Welford's update)"""
+
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def step(self, value):
+        if value is None:
+            return
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def finalize(self):
+        return math.sqrt(self.m2 / self.n) if self.n else None
+
+
+SQLITE_FUNCTIONS = {
+    "CONCAT": (-1, _concat),
+    "LPAD": (3, _lpad),
+    "STR_TO_DATE": (2, _str_to_date),
+    "DATE_FORMAT": (2, _date_format),
+    "MAKEDATE": (2, _makedate),
+    "YEAR": (1, lambda v: None if _date(v) is None else _date(v).year),
+    "MONTH": (1, lambda v: None if _date(v) is None else _date(v).month),
+    "SQRT": (1, lambda v: None if v is None or v < 0 else math.sqrt(v)),
+    "POW": (2, lambda a, b: None if a is None or b is None else math.pow(a, b)),
+    "RAND": (0, random.random),
+}
+
+
+def register_sqlite_functions(dbapi_connection, connection_record=None):
+    """Make the MySQL functions used by this project's SQL available on a SQLite connection"""
+    for name, (n_args, func) in SQLITE_FUNCTIONS.items():
+        dbapi_connection.create_function(name, n_args, func)
+    dbapi_connection.create_aggregate("STDDEV", 1, _StdDev)
+
+
+def make_engine(backend, url=None, path=None, pool=None):
+    """
+    Create the SQLAlchemy engine for a backend: a MySQL server URL or a SQLite file path.
+    pool: settings from database.pool.pool_config (size, overflow, timeouts, pre-ping, recycle).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown database backend '{backend}', expected one of {BACKENDS}")
+    pool = dict(pool or {})
+    connect_timeout = pool.pop("connect_timeout", None)
+    if backend == "mysql":
+        # LOAD DATA LOCAL INFILE has to be enabled on the client side too
+        connect_args = {"local_infile": True}
+        if connect_timeout:
+            connect_args["connect_timeout"] = connect_timeout
+        return create_engine(url, connect_args=connect_args, **pool)
+
+    # SQLite's timeout is how long to wait for a lock held by another connection
+    connect_args = {"timeout": connect_timeout} if connect_timeout else {}
+    engine = create_engine(f"sqlite:///{path}", connect_args=connect_args, **pool)
+    event.listen(engine, "connect", register_sqlite_functions)
+    return engine
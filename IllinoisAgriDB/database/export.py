@@ -0,0 +1,179 @@
+import io
+import os
+import sys
+from sqlalchemy import inspect
+from database.series import parse_date
+
+# Bulk export of the weather and soil tables (or a station/county/date slice of them) as
+# Parquet or Arrow IPC. Rows are read from a server-side cursor and written one record
+# batch at a time, so memory stays bounded by the chunk size, not the table size.
+# pyarrow is optional and only imported when an export runs.
+#   python -m database.export weather exports/weather.parquet station=Peoria start=2020-01-01
+
+EXPORT_TABLES = ("weather", "soil")
+
+# format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrows", "application/vnd.apache.arrow.stream")
+}
+
+# Fixed column types; every other (measurement) column is float32.
+# The text `date` column duplicates obs_date and is left out.
+KEY_TYPES = {
+    "station": "dictionary",
+    "county": "dictionary",
+    "year": "int16",
+    "month": "int8",
+    "day": "int8",
+    "obs_date": "date32"
+}
+
+DEFAULT_EXPORT_CHUNK_SIZE = 50000
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("Exporting to Parquet/Arrow needs pyarrow: pip install pyarrow")
+
+
+def export_columns(engine, table):
+    """Columns of a table in export order: keys first, then measurements"""
+    names = [c["name"] for c in inspect(engine).get_columns(table)]
+    keys = [name for name in KEY_TYPES if name in names]
+    return keys + [name for name in names if name not in KEY_TYPES and name != "date"]
+
+
+def arrow_schema(columns):
+    """Arrow schema for export_columns(); obs_date is written as `date`"""
+    pa = _pyarrow()
+    types = {
+        "dictionary": pa.dictionary(pa.int32(), pa.string()),
+        "int16": pa.int16(),
+        "int8": pa.int8(),
+        "date32": pa.date32()
+    }
+    return pa.schema([
+        pa.field("date" if name == "obs_date" else name, types[KEY_TYPES[name]] if name in KEY_TYPES else pa.float32())
+        for name in columns
+    ])
+
+
+def export_query(table, columns, station=None, county=None, start=None, end=None):
+    """SELECT for an export slice, ordered by (station, obs_date) to follow the table's index"""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table '{table}', expected one of {EXPORT_TABLES}")
+    where, params = [], {}
+    if station:
+        where.append("station = :station")
+        params["station"] = station
+    if county:
+        where.append("county = :county")
+        params["county"] = county
+    start, end = parse_date(start, "start"), parse_date(end, "end")
+    if start:
+        where.append("obs_date >= :start")
+        params["start"] = start
+    if end:
+        where.append("obs_date <= :end")
+        params["end"] = end
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql + " ORDER BY station, obs_date", params
+
+
+def record_batch(schema, rows):
+    """Convert a list of row tuples into a RecordBatch with the export schema"""
+    pa = _pyarrow()
+    arrays = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in rows]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode())
+        elif pa.types.is_date32(field.type) and any(isinstance(v, str) for v in values):
+            # SQLite returns dates as 'YYYY-MM-DD' text
+            arrays.append(pa.array(values, pa.string()).cast(pa.date32()))
+        else:
+            arrays.append(pa.array(values, field.type, from_pandas=True))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that collects bytes until they are drained"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_chunks(db, table, fmt="parquet", chunk_size=DEFAULT_EXPORT_CHUNK_SIZE, **filters):
+    """
+    Yield the encoded export as byte chunks: one Parquet row group or Arrow record
+    batch per chunk_size rows. filters: station, county, start, end (ISO dates).
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {tuple(EXPORT_FORMATS)}")
+    pa = _pyarrow()
+    columns = export_columns(db.connect(), table) if table in EXPORT_TABLES else []
+    query, params = export_query(table, columns, **filters)
+    schema = arrow_schema(columns)
+
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pa.parquet.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        # The stream format allows each batch to carry its own dictionaries
+        writer = pa.ipc.new_stream(sink, schema)
+
+    rows = []
+    for row in db.stream_rows(query, params, batch_size=min(chunk_size, 10000)):
+        rows.append(row)
+        if len(rows) >= chunk_size:
+            writer.write_batch(record_batch(schema, rows))
+            rows = []
+            yield sink.drain()
+    if rows:
+        writer.write_batch(record_batch(schema, rows))
+    writer.close()
+    yield sink.drain()
+
+
+def export_file(db, table, path, fmt=None, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE, **filters):
+    """Export to a file; the format defaults to the one matching the file extension"""
+    if fmt is None:
+        extension = os.path.splitext(path)[1]
+        fmt = "arrow" if extension in (".arrow", ".arrows") else "parquet"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    size = 0
+    with open(path, "wb") as f:
+        for chunk in export_chunks(db, table, fmt, chunk_size, **filters):
+            f.write(chunk)
+            size += len(chunk)
+    print(f"Exported {table} to {path} ({fmt}, {size:,} bytes)")
+    return path
+
+
+if __name__ == "__main__":
+    # python -m database.export <weather|soil> <OUT_PATH> [station=NAME] [county=NAME] [start=YYYY-MM-DD] [end=YYYY-MM-DD]
+    from database.db_setup import DatabaseConnection
+    if len(sys.argv) < 3:
+        raise RuntimeError("Usage: python -m database.export <weather|soil> <OUT_PATH> "
+                           "[station=NAME] [county=NAME] [start=YYYY-MM-DD] [end=YYYY-MM-DD]")
+    options = dict(arg.split("=", 1) for arg in sys.argv[3:])
+    export_file(DatabaseConnection(), sys.argv[1], sys.argv[2], **options)
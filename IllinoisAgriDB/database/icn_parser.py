@@ -0,0 +1,150 @@
+import io
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Parser for the raw Illinois Climate Network daily files (project_data/alldata-unclean).
+# Run from the project root: python -m database.icn_parser <data dir or .zip> [OUT_DIR]
+
+DATE_COLUMNS = ["year", "month", "day"]
+DATE_DTYPES = {"year": np.int16, "month": np.int8, "day": np.int8}
+
+# Error flags (the column right after each value): M = missing, E = estimated
+MISSING_FLAGS = ("M",)
+ESTIMATED_FLAGS = ("E",)
+
+# Some station files have a mislabelled value column; the flag next to it names the real sensor
+FLAG_VALUE_NAMES = {"xst8er": "max_soiltemp_8in"}
+
+
+def split_columns(header):
+    """
+    Split a *DAY.txt header into (value columns, flag columns).
+    Every measurement is followed by its error-flag column, e.g. precip / pcer.
+    """
+    body = [c for c in header if c not in DATE_COLUMNS and c != "site"]
+    return body[0::2], body[1::2]
+
+
+def soil_column(name):
+    """Map a raw soil sensor name to the cleaned table's naming (soiltemp -> soil_temp)"""
+    return name.replace("soiltemp", "soil_temp")
+
+
+def _read_bytes(source, member=None):
+    """Read a station file from disk, or from inside a zip archive without extracting it"""
+    if member is None:
+        with open(source, "rb") as f:
+            return f.read()
+    with zipfile.ZipFile(source) as archive:
+        with archive.open(member) as f:
+            return f.read()
+
+
+def parse_station_file(source, member=None, drop_estimated=False, station_names=None):
+    """
+    Parse one station's daily file into (weather, soil) DataFrames.
+
+    Values are converted column-wise into float32; readings flagged as missing
+    (and optionally estimated) are turned into NaN with one vectorized mask.
+    The station is identified by the file's `site` code, upper-cased, or by
+    `station_names[code]` when a mapping is given.
+    """
+    lines = _read_bytes(source, member).splitlines()
+    header = [c.strip() for c in lines[0].decode().rstrip("\t\r\n ").split("\t")]
+    values, flags = split_columns(header)
+    values = [FLAG_VALUE_NAMES.get(flag, value) if value in values[:i] else value
+              for i, (value, flag) in enumerate(zip(values, flags))]
+    columns = DATE_COLUMNS + [c for pair in zip(values, flags) for c in pair] + ["site"]
+
+    # Keep only the data rows: skip the units line and the notes at the end of the file
+    data = b"\n".join(line.rstrip(b"\t\r ") for line in lines[2:] if line[:1].isdigit())
+    df = pd.read_csv(
+        io.BytesIO(data), sep="\t", header=None, names=columns, dtype=str,
+        keep_default_na=False, skipinitialspace=True, on_bad_lines="skip"
+    )
+
+    # Column-wise numeric conversion; dashes, blanks and stray tokens ("58.2M") become NaN
+    dates = df[DATE_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    readings = df[values].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32, copy=True)
+    bad_flags = MISSING_FLAGS + (ESTIMATED_FLAGS if drop_estimated else ())
+    bad_flags = [f for flag in bad_flags for f in (flag, flag.lower())]
+    readings[np.isin(df[flags].to_numpy(dtype=str), bad_flags)] = np.nan
+
+    observed = pd.to_datetime(dates, errors="coerce")
+    valid = observed.notna().to_numpy()
+    df, dates, readings, observed = df[valid], dates[valid], readings[valid], observed[valid]
+
+    # The site code is on every row; fall back to the file name prefix (BBCDAY.txt -> BBC)
+    sites = df["site"].fillna("").str.strip()
+    sites = sites[sites != ""]
+    code = (sites.mode().iloc[0] if not sites.empty else os.path.basename(member or source)[:3]).upper()
+    keys = dates.astype(DATE_DTYPES).reset_index(drop=True)
+    keys.insert(0, "station", (station_names or {}).get(code, code))
+    keys["date"] = observed.dt.strftime("%Y-%m-%d").to_numpy()
+
+    is_soil = np.array(["soiltemp" in v for v in values])
+    weather = pd.concat(
+        [keys, pd.DataFrame(readings[:, ~is_soil], columns=np.array(values)[~is_soil])], axis=1
+    )
+    soil = pd.concat(
+        [keys, pd.DataFrame(readings[:, is_soil], columns=[soil_column(v) for v in np.array(values)[is_soil]])],
+        axis=1
+    )
+    return weather, soil
+
+
+def list_station_files(source):
+    """Return [(source, member)] for every *DAY.txt in a directory or zip archive"""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            names = archive.namelist()
+        return [(source, n) for n in sorted(names) if "day" in n.lower() and n.lower().endswith(".txt")]
+    return [
+        (os.path.join(source, n), None) for n in sorted(os.listdir(source))
+        if n.lower().endswith("day.txt")
+    ]
+
+
+def _parse_task(args):
+    """Process pool entry point: parse one (source, member) pair"""
+    source, member, drop_estimated, station_names = args
+    return parse_station_file(source, member, drop_estimated, station_names)
+
+
+def parse_icn_data(source, drop_estimated=False, station_names=None, workers=None):
+    """
+    Parse every station file in `source` (a directory or allstations*.zip) in
+    parallel, one worker per station file, and return combined (weather, soil).
+    """
+    files = list_station_files(source)
+    if not files:
+        raise ValueError(f"No *DAY.txt station files found in {source}")
+
+    start = time.perf_counter()
+    tasks = [(path, member, drop_estimated, station_names) for path, member in files]
+    with ProcessPoolExecutor(max_workers=workers or min(len(files), os.cpu_count() or 1)) as pool:
+        results = list(pool.map(_parse_task, tasks))
+
+    weather = pd.concat([w for w, _ in results], ignore_index=True)
+    soil = pd.concat([s for _, s in results], ignore_index=True)
+    print(f"Parsed {len(files)} station files ({len(weather):,} days) in {time.perf_counter() - start:.2f}s")
+    return weather, soil
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise RuntimeError("Usage: python -m database.icn_parser <DATA_DIR | ZIP_FILE> [OUT_DIR]")
+    weather, soil = parse_icn_data(sys.argv[1])
+    if len(sys.argv) > 2:
+        os.makedirs(sys.argv[2], exist_ok=True)
+        weather.to_csv(os.path.join(sys.argv[2], "weather.csv"), index=False)
+        soil.to_csv(os.path.join(sys.argv[2], "soil_condition.csv"), index=False)
+        print(f"Wrote weather.csv and soil_condition.csv to {sys.argv[2]}")
+    else:
+        print(weather.head())
+        print(soil.head())
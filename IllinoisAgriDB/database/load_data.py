@@ -1,6 +1,9 @@
 import pandas as pd
 from sqlalchemy import create_engine
 import os
+from database.bulk_loader import BulkLoader
+
+# Run from the project root: python -m database.load_data
 
 # MySQL login info
 user = "root"
@@ -9,8 +12,15 @@ host = "localhost"
 port = 3306
 database = "cs411_farm_data"
 
+# Bulk load settings
+chunk_size = 50000        # rows per batch; memory use stays flat regardless of file size
+method = "executemany"    # or "infile" for LOAD DATA LOCAL INFILE (server needs local_infile=ON)
+
 # MySQL connection engine
-engine = create_engine(f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}")
+engine = create_engine(
+    f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}",
+    connect_args={"local_infile": True}
+)
 
 # Folder with your CSVs - using your project's data directory
 base_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "project_data")
@@ -24,14 +34,14 @@ csv_table_map = {
     "soil_condition.csv": "soil",
 }
 
-# Load each CSV into MySQL
+# Stream each CSV into MySQL
+loader = BulkLoader(engine, chunk_size=chunk_size, method=method)
 for filename, table_name in csv_table_map.items():
     full_path = os.path.join(base_path, filename)
     print(f"Loading {filename} into table '{table_name}'")
-    
+
     if os.path.exists(full_path):
-        df = pd.read_csv(full_path)
-        df.to_sql(table_name, con=engine, if_exists="replace", index=False)
+        loader.load_csv(full_path, table_name)
     else:
         print(f"Warning: File {filename} not found in {base_path}")
 
@@ -43,4 +53,4 @@ with engine.connect() as conn:
     for table_name in csv_table_map.values():
         print(f"\nPreview of '{table_name}':")
         preview_df = pd.read_sql(f"SELECT * FROM {table_name} LIMIT 3;", conn)
-        print(preview_df) 
\ No newline at end of file
+        print(preview_df)
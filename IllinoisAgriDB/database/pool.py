@@ -0,0 +1,68 @@
+import os
+import threading
+
+# Connection pool settings; each can be overridden with an environment variable
+POOL_DEFAULTS = {
+    "pool_size": ("DB_POOL_SIZE", 5),              # connections kept open
+    "max_overflow": ("DB_MAX_OVERFLOW", 10),       # extra connections allowed under load
+    "pool_timeout": ("DB_POOL_TIMEOUT", 30),       # seconds to wait for a free connection
+    "pool_recycle": ("DB_POOL_RECYCLE", 3600),     # reconnect connections older than this (MySQL wait_timeout)
+    "pool_pre_ping": ("DB_POOL_PRE_PING", 1),      # test connections before handing them out
+    "connect_timeout": ("DB_CONNECT_TIMEOUT", 10)  # seconds to wait when opening a new connection
+}
+
+
+def pool_config(**overrides):
+    """Pool settings from keyword overrides, then environment variables, then defaults"""
+    config = {}
+    for name, (env_name, default) in POOL_DEFAULTS.items():
+        value = overrides.get(name)
+        if value is None:
+            value = os.getenv(env_name, default)
+        config[name] = bool(int(value)) if name == "pool_pre_ping" else int(value)
+    return config
+
+
+class PoolMetrics:
+    """
+    Counts connection checkouts and how long callers waited for one, plus the
+    most connections in use at once, to help size the pool and the web workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.peak_in_use = 0
+
+    def record_checkout(self, wait, in_use):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self, pool=None):
+        """Current counters, plus the live pool state when a QueuePool is given"""
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "errors": self.errors,
+                "avg_wait_ms": round(1000 * self.total_wait / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait, 3),
+                "peak_in_use": self.peak_in_use
+            }
+        if pool is not None and hasattr(pool, "checkedout"):
+            stats.update({
+                "size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": pool.overflow()
+            })
+        return stats
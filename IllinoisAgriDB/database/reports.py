@@ -0,0 +1,182 @@
+# The four analysis reports as SQL over the raw tables (MySQL dialect).
+# database/rollups.py answers the same reports from the monthly rollups and
+# database/analytics.py computes them in-process with pandas.
+
+REPORT_QUERIES = {
+    # Query 1: Agricultural Success Prediction by Region
+    "Regional Analysis": """
+    WITH RegionalSoilStats AS (
+        SELECT 
+            s.location,
+            sc.obs_date,
+            AVG(sc.max_soil_temp_4in_sod) AS avg_max_soil_temp,
+            AVG(sc.min_soil_temp_4in_sod) AS avg_min_soil_temp,
+            AVG(w.precip) AS avg_precipitation
+        FROM 
+            soil sc
+        JOIN 
+            stations s ON sc.station = s.station_name
+        JOIN 
+            weather w ON w.station = sc.station AND w.obs_date = sc.obs_date
+        WHERE 
+            sc.obs_date >= '2020-01-01'
+        GROUP BY 
+            s.location, sc.obs_date
+    )
+    SELECT 
+        cp.Crop AS crop_type,
+        rss.location,
+        ROUND(AVG(rss.avg_max_soil_temp), 1) AS avg_max_soil_temp,
+        ROUND(AVG(rss.avg_min_soil_temp), 1) AS avg_min_soil_temp,
+        ROUND(AVG(rss.avg_precipitation), 2) AS avg_rainfall,
+        COUNT(DISTINCT sc.station) AS station_count
+    FROM 
+        RegionalSoilStats rss
+    JOIN 
+        stations s ON rss.location = s.location
+    JOIN 
+        soil sc ON s.station_name = sc.station AND sc.obs_date = rss.obs_date
+    JOIN 
+        crops_planning cp
+    GROUP BY 
+        cp.Crop, rss.location
+    HAVING 
+        COUNT(DISTINCT sc.station) >= 2
+    ORDER BY 
+        cp.Crop;
+    """,
+
+    # Query 2: User Expertise Analysis
+    "User Expertise Analysis": """
+    WITH UserCropExpertise AS (
+        SELECT 
+            u.user_id,
+            u.crop_type AS preferred_crop,
+            COUNT(DISTINCT s.station_name) AS managed_stations
+        FROM 
+            users u
+        JOIN 
+            stations s
+        GROUP BY 
+            u.user_id, u.crop_type
+        HAVING 
+            COUNT(DISTINCT s.station_name) >= 2
+    )
+    SELECT 
+        uce.user_id,
+        uce.preferred_crop,
+        uce.managed_stations,
+        COUNT(w.obs_date) as weather_records
+    FROM 
+        UserCropExpertise uce
+    LEFT JOIN 
+        stations s ON s.station_name IN (
+            SELECT station_name 
+            FROM stations 
+            WHERE location IN (
+                SELECT location 
+                FROM stations 
+                WHERE station_name = uce.user_id
+            )
+        )
+    LEFT JOIN 
+        weather w ON w.station = s.station_name
+    GROUP BY 
+        uce.user_id, uce.preferred_crop, uce.managed_stations
+    ORDER BY 
+        uce.managed_stations DESC;
+    """,
+
+    # Query 3: Environmental Anomaly Analysis
+    "Environmental Anomaly Analysis": """
+    WITH EnvironmentalNorms AS (
+        SELECT
+            w.station,
+            w.month,
+            AVG(w.avg_air_temp) AS avg_temp_norm,
+            STDDEV(w.avg_air_temp) AS temp_stddev,
+            AVG(w.precip) AS avg_precip_norm,
+            STDDEV(w.precip) AS precip_stddev
+        FROM
+            weather w
+        WHERE
+            w.obs_date < MAKEDATE(YEAR(CURRENT_DATE), 1)
+        GROUP BY
+            w.station, w.month
+    )
+    SELECT 
+        w.station AS station_name,
+        s.location,
+        DATE_FORMAT(w.obs_date, '%Y-%m') AS month,
+        ROUND(AVG(w.avg_air_temp - en.avg_temp_norm) / en.temp_stddev, 2) AS temp_anomaly,
+        ROUND(AVG(w.precip - en.avg_precip_norm) / en.precip_stddev, 2) AS precip_anomaly,
+        COUNT(*) as days_count
+    FROM 
+        weather w
+    JOIN 
+        stations s ON w.station = s.station_name
+    JOIN 
+        EnvironmentalNorms en ON w.station = en.station 
+                               AND w.month = en.month
+    WHERE 
+        w.obs_date >= MAKEDATE(YEAR(CURRENT_DATE) - 1, 1)
+        AND w.obs_date < MAKEDATE(YEAR(CURRENT_DATE), 1)
+    GROUP BY 
+        w.station, s.location, DATE_FORMAT(w.obs_date, '%Y-%m')
+    HAVING 
+        ABS(temp_anomaly) > 1.5 OR ABS(precip_anomaly) > 1.5
+    ORDER BY 
+        ABS(temp_anomaly) DESC;
+    """,
+
+    # Query 4: Seasonal Planning Analysis
+    "Seasonal Planning Analysis": """
+    WITH SeasonalData AS (
+        SELECT 
+            s.station_name,
+            s.location,
+            CASE 
+                WHEN w.month BETWEEN 3 AND 5 THEN 'Spring'
+                WHEN w.month BETWEEN 6 AND 8 THEN 'Summer'
+                WHEN w.month BETWEEN 9 AND 11 THEN 'Fall'
+                ELSE 'Winter'
+            END AS season,
+            AVG(w.avg_air_temp) AS avg_temp,
+            AVG(w.precip) AS avg_precip,
+            COUNT(*) as days_count
+        FROM 
+            stations s
+        JOIN 
+            weather w ON s.station_name = w.station
+        GROUP BY 
+            s.station_name, s.location,
+            CASE 
+                WHEN w.month BETWEEN 3 AND 5 THEN 'Spring'
+                WHEN w.month BETWEEN 6 AND 8 THEN 'Summer'
+                WHEN w.month BETWEEN 9 AND 11 THEN 'Fall'
+                ELSE 'Winter'
+            END
+    )
+    SELECT 
+        sd.location,
+        sd.season,
+        ROUND(AVG(sd.avg_temp), 1) AS avg_temperature,
+        ROUND(AVG(sd.avg_precip), 2) AS avg_precipitation,
+        COUNT(DISTINCT sd.station_name) AS station_count,
+        GROUP_CONCAT(DISTINCT cp.Crop) AS suitable_crops
+    FROM 
+        SeasonalData sd
+    JOIN 
+        crops_planning cp
+    GROUP BY 
+        sd.location, sd.season
+    ORDER BY 
+        sd.location, 
+        CASE sd.season
+            WHEN 'Spring' THEN 1
+            WHEN 'Summer' THEN 2
+            WHEN 'Fall' THEN 3
+            WHEN 'Winter' THEN 4
+        END;
+    """
+}
@@ -0,0 +1,268 @@
+import time
+import calendar
+import datetime
+from sqlalchemy import text, inspect
+
+# Monthly rollups behind the query_examples reports. Each row holds, per (station, year, month),
+# the day count plus n / sum / sum of squares for every measure, so means and (population)
+# standard deviations over any set of months are SUM(sum) / SUM(n) and
+# SQRT(SUM(sumsq) / SUM(n) - mean^2) without touching the raw tables.
+
+ROLLUPS = {
+    "weather_monthly": {
+        "source": "weather w",
+        "measures": {"temp": "w.avg_air_temp", "precip": "w.precip"},
+        "depends_on": ("weather",)
+    },
+    # Days with both a weather and a soil reading, as in the regional report's join
+    "paired_monthly": {
+        "source": "weather w JOIN soil s ON s.station = w.station AND s.obs_date = w.obs_date",
+        "measures": {
+            "max_soil": "s.max_soil_temp_4in_sod",
+            "min_soil": "s.min_soil_temp_4in_sod",
+            "precip": "w.precip"
+        },
+        "depends_on": ("weather", "soil")
+    }
+}
+
+SEASON_CASE = """CASE
+                WHEN {month} BETWEEN 3 AND 5 THEN 'Spring'
+                WHEN {month} BETWEEN 6 AND 8 THEN 'Summer'
+                WHEN {month} BETWEEN 9 AND 11 THEN 'Fall'
+                ELSE 'Winter'
+            END"""
+
+# The four query_examples reports, answered from the rollups. Same output columns as the raw
+# queries; the regional averages are day-weighted over the paired days rather than an
+# average of per-day averages.
+ROLLUP_REPORTS = {
+    "Regional Analysis": """
+    SELECT
+        cp.crop_type,
+        r.location,
+        r.avg_max_soil_temp,
+        r.avg_min_soil_temp,
+        r.avg_rainfall,
+        r.station_count
+    FROM (
+        SELECT
+            s.location,
+            ROUND(SUM(p.sum_max_soil) / SUM(p.n_max_soil), 1) AS avg_max_soil_temp,
+            ROUND(SUM(p.sum_min_soil) / SUM(p.n_min_soil), 1) AS avg_min_soil_temp,
+            ROUND(SUM(p.sum_precip) / SUM(p.n_precip), 2) AS avg_rainfall,
+            COUNT(DISTINCT p.station) AS station_count
+        FROM
+            paired_monthly p
+        JOIN
+            stations s ON p.station = s.station_name
+        WHERE
+            p.year >= 2020
+        GROUP BY
+            s.location
+        HAVING
+            COUNT(DISTINCT p.station) >= 2
+    ) r
+    CROSS JOIN
+        (SELECT DISTINCT Crop AS crop_type FROM crops_planning) cp
+    ORDER BY
+        cp.crop_type;
+    """,
+
+    "User Expertise Analysis": """
+    SELECT
+        u.user_id,
+        u.preferred_crop,
+        m.managed_stations,
+        COALESCE(SUM(wm.days), 0) AS weather_records
+    FROM
+        (SELECT DISTINCT user_id, crop_type AS preferred_crop FROM users) u
+    CROSS JOIN
+        (SELECT COUNT(DISTINCT station_name) AS managed_stations FROM stations) m
+    LEFT JOIN
+        stations us ON us.station_name = u.user_id
+    LEFT JOIN
+        stations s ON s.location = us.location
+    LEFT JOIN
+        weather_monthly wm ON wm.station = s.station_name
+    WHERE
+        m.managed_stations >= 2
+    GROUP BY
+        u.user_id, u.preferred_crop, m.managed_stations
+    ORDER BY
+        m.managed_stations DESC;
+    """,
+
+    "Environmental Anomaly Analysis": """
+    SELECT * FROM (
+        SELECT
+            m.station AS station_name,
+            s.location,
+            CONCAT(m.year, '-', LPAD(m.month, 2, '0')) AS month,
+            ROUND((m.sum_temp / m.n_temp - en.avg_temp_norm) / en.temp_stddev, 2) AS temp_anomaly,
+            ROUND((m.sum_precip / m.n_precip - en.avg_precip_norm) / en.precip_stddev, 2) AS precip_anomaly,
+            m.days AS days_count
+        FROM
+            weather_monthly m
+        JOIN
+            stations s ON m.station = s.station_name
+        JOIN (
+            SELECT
+                station,
+                month,
+                SUM(sum_temp) / SUM(n_temp) AS avg_temp_norm,
+                SQRT(SUM(sumsq_temp) / SUM(n_temp) - POW(SUM(sum_temp) / SUM(n_temp), 2)) AS temp_stddev,
+                SUM(sum_precip) / SUM(n_precip) AS avg_precip_norm,
+                SQRT(SUM(sumsq_precip) / SUM(n_precip) - POW(SUM(sum_precip) / SUM(n_precip), 2)) AS precip_stddev
+            FROM
+                weather_monthly
+            WHERE
+                year < YEAR(CURRENT_DATE)
+            GROUP BY
+                station, month
+        ) en ON m.station = en.station AND m.month = en.month
+        WHERE
+            m.year = YEAR(CURRENT_DATE) - 1
+    ) a
+    WHERE
+        ABS(a.temp_anomaly) > 1.5 OR ABS(a.precip_anomaly) > 1.5
+    ORDER BY
+        ABS(a.temp_anomaly) DESC;
+    """,
+
+    "Seasonal Planning Analysis": f"""
+    SELECT
+        sd.location,
+        sd.season,
+        ROUND(AVG(sd.avg_temp), 1) AS avg_temperature,
+        ROUND(AVG(sd.avg_precip), 2) AS avg_precipitation,
+        COUNT(DISTINCT sd.station_name) AS station_count,
+        (SELECT GROUP_CONCAT(DISTINCT Crop) FROM crops_planning) AS suitable_crops
+    FROM (
+        SELECT
+            s.station_name,
+            s.location,
+            {SEASON_CASE.format(month="m.month")} AS season,
+            SUM(m.sum_temp) / SUM(m.n_temp) AS avg_temp,
+            SUM(m.sum_precip) / SUM(m.n_precip) AS avg_precip,
+            SUM(m.days) AS days_count
+        FROM
+            stations s
+        JOIN
+            weather_monthly m ON s.station_name = m.station
+        GROUP BY
+            s.station_name, s.location,
+            {SEASON_CASE.format(month="m.month")}
+    ) sd
+    GROUP BY
+        sd.location, sd.season
+    ORDER BY
+        sd.location,
+        CASE sd.season
+            WHEN 'Spring' THEN 1
+            WHEN 'Summer' THEN 2
+            WHEN 'Fall' THEN 3
+            WHEN 'Winter' THEN 4
+        END;
+    """
+}
+
+
+def month_bounds(year, month):
+    """First day of the month and first day of the next month"""
+    start = datetime.date(int(year), int(month), 1)
+    return start, start + datetime.timedelta(days=calendar.monthrange(start.year, start.month)[1])
+
+
+class Rollups:
+    """
+    Maintains the monthly rollup tables. refresh() rebuilds them from scratch;
+    refresh(touched) recomputes only the (station, year, month) rows that an
+    incremental ingest wrote to, using the (station, obs_date) index.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    @staticmethod
+    def columns(name):
+        """Aggregate columns of a rollup: days, then n_/sum_/sumsq_ per measure"""
+        columns = {"days": "COUNT(*)"}
+        for measure, expr in ROLLUPS[name]["measures"].items():
+            columns[f"n_{measure}"] = f"COUNT({expr})"
+            columns[f"sum_{measure}"] = f"SUM({expr})"
+            columns[f"sumsq_{measure}"] = f"SUM({expr} * {expr})"
+        return columns
+
+    def ensure_tables(self):
+        """Create any missing rollup tables; returns the names that had to be created"""
+        existing = set(inspect(self.engine).get_table_names())
+        created = []
+        with self.engine.begin() as conn:
+            for name in ROLLUPS:
+                if name in existing:
+                    continue
+                measures = ",\n".join(
+                    f"    {c} {'INT' if c == 'days' or c.startswith('n_') else 'DOUBLE'}"
+                    for c in self.columns(name)
+                )
+                conn.execute(text(f"""
+                CREATE TABLE {name} (
+                    station VARCHAR(64) NOT NULL,
+                    year INT NOT NULL,
+                    month INT NOT NULL,
+                {measures},
+                    PRIMARY KEY (station, year, month)
+                )
+                """))
+                created.append(name)
+        return created
+
+    def select_statement(self, name, where):
+        """INSERT ... SELECT that aggregates the source rows matching `where` into the rollup"""
+        columns = self.columns(name)
+        return f"""
+        INSERT INTO {name} (station, year, month, {", ".join(columns)})
+        SELECT w.station, w.year, w.month, {", ".join(columns.values())}
+        FROM {ROLLUPS[name]["source"]}
+        WHERE {where}
+        GROUP BY w.station, w.year, w.month
+        """
+
+    def refresh(self, touched=None):
+        """
+        Rebuild every rollup (touched=None), or only the months in
+        touched = {table: set of (station, year, month)} as returned by ingest_incremental.
+        Returns {rollup: rows written}.
+        """
+        start = time.perf_counter()
+        created = self.ensure_tables()
+        written = {}
+        with self.engine.begin() as conn:
+            for name, spec in ROLLUPS.items():
+                if touched is None or name in created:
+                    conn.execute(text(f"DELETE FROM {name}"))
+                    conn.execute(text(self.select_statement(name, "w.obs_date IS NOT NULL")))
+                    written[name] = conn.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar()
+                    continue
+
+                keys = set()
+                for table in spec["depends_on"]:
+                    keys.update(touched.get(table, ()))
+                if not keys:
+                    continue
+                params = []
+                for station, year, month in sorted(keys):
+                    first, after = month_bounds(year, month)
+                    params.append({"station": station, "year": int(year), "month": int(month),
+                                   "start": first, "end": after})
+                conn.execute(text(f"""
+                DELETE FROM {name} WHERE station = :station AND year = :year AND month = :month
+                """), params)
+                conn.execute(text(self.select_statement(
+                    name, "w.station = :station AND w.obs_date >= :start AND w.obs_date < :end"
+                )), params)
+                written[name] = len(params)
+
+        print(f"Refreshed rollups {written} in {time.perf_counter() - start:.2f}s")
+        return written
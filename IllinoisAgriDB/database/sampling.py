@@ -0,0 +1,175 @@
+import random
+import numpy as np
+import pandas as pd
+
+
+def _to_day(value):
+    """Convert a 'YYYY-MM-DD' string (or date) to an integer day number, None stays None"""
+    if value is None or value == "":
+        return None
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def _from_day(day):
+    """Convert an integer day number back to a datetime.date"""
+    return np.datetime64(int(day), "D").astype(object)
+
+
+# Tables sampled on their own when a station has no day with both weather and soil
+SINGLE_TABLES = ("weather", "soil")
+
+
+class SamplingIndex:
+    """
+    Precomputed index of every (station, date) pair that has both a weather
+    and a soil row, so get_random_station can draw a sample without
+    ORDER BY RAND() scans.
+
+    Pairs are stored as compact int32 arrays (station id, day number) sorted
+    by day and bucketed by (region, crop). A crop of None means "any crop".
+    Date ranges are resolved with a binary search, the draw itself is O(1).
+    Each station's weather-only and soil-only days are kept too, for the
+    fallback when a station has no paired day.
+    """
+
+    def __init__(self):
+        self.stations = []          # station id -> station name
+        self.locations = {}         # station name -> location string
+        self.region_stations = {}   # region -> [station names], including stations without data
+        self.station_regions = {}   # station name -> [regions]
+        self.station_days = {}      # station name -> sorted day numbers
+        self.buckets = {}           # (region, crop) -> (station ids, day numbers)
+        self.table_days = {}        # "weather"/"soil" -> {station name: sorted day numbers}, paired or not
+        self.pair_count = 0
+        self.version = None         # data version the index was built from
+
+    @classmethod
+    def build(cls, db):
+        """
+        Build the index from the loaded weather, soil, stations and users tables; regions
+        come from the normalized station_counties mapping (db.get_county_index()).
+        """
+        index = cls()
+
+        stations = db.execute_query("SELECT station_name, location FROM stations")
+        pairs = db.execute_query("""
+        SELECT DISTINCT w.station, w.obs_date
+        FROM weather w
+        JOIN soil s ON w.station = s.station AND w.obs_date = s.obs_date
+        """)
+        users = db.execute_query("""
+        SELECT user_id, crop_type FROM users
+        WHERE crop_type IS NOT NULL AND crop_type != ''
+        """)
+
+        if stations is None or stations.empty:
+            return index
+
+        for name, location in zip(stations["station_name"], stations["location"]):
+            if name in index.locations:
+                continue
+            index.locations[name] = location
+            index.stations.append(name)
+
+        counties = db.get_county_index()
+        index.region_stations = {region: list(names) for region, names in counties.county_stations.items()}
+        index.station_regions = {name: list(regions) for name, regions in counties.station_counties.items()}
+
+        # Days each station has in one table only, for stations without any paired day
+        for table in SINGLE_TABLES:
+            rows = db.execute_query(f"SELECT DISTINCT station, obs_date FROM {table}")
+            index.table_days[table] = {}
+            if rows is None or rows.empty:
+                continue
+            days = pd.to_datetime(rows["obs_date"]).to_numpy().astype("datetime64[D]").astype(np.int32)
+            for name, station_days in pd.Series(days).groupby(rows["station"].to_numpy()):
+                index.table_days[table][name] = np.sort(station_days.to_numpy())
+
+        if pairs is None or pairs.empty:
+            return index
+
+        station_ids = {name: i for i, name in enumerate(index.stations)}
+        pairs = pairs[pairs["station"].isin(station_ids)]
+        ids = pairs["station"].map(station_ids).to_numpy(dtype=np.int32)
+        days = (
+            pd.to_datetime(pairs["obs_date"]).to_numpy()
+            .astype("datetime64[D]").astype(np.int32)
+        )
+        order = np.argsort(days, kind="stable")
+        ids, days = ids[order], days[order]
+        index.pair_count = len(days)
+
+        # Crops follow the same users.user_id = stations.station_name link the SQL used
+        station_crops = {}
+        if users is not None and not users.empty:
+            for user_id, crop in zip(users["user_id"], users["crop_type"]):
+                if user_id in station_ids:
+                    station_crops.setdefault(user_id, set()).add(crop)
+
+        for name, station_id in station_ids.items():
+            mask = ids == station_id
+            if not mask.any():
+                continue
+            index.station_days[name] = days[mask]
+            for region in index.station_regions.get(name, ()):
+                for crop in [None, *station_crops.get(name, ())]:
+                    index.buckets.setdefault((region, crop), []).append(mask)
+
+        # Collapse the per-station masks into one sorted array per bucket
+        for key, masks in index.buckets.items():
+            mask = np.logical_or.reduce(masks)
+            index.buckets[key] = (ids[mask], days[mask])
+
+        print(f"Sampling index built: {index.pair_count} (station, date) pairs, {len(index.buckets)} buckets")
+        return index
+
+    @staticmethod
+    def _day_range(days, start_date=None, end_date=None):
+        """Return the [lo, hi) slice of a sorted day array that falls within the date range"""
+        lo, hi = 0, len(days)
+        start, end = _to_day(start_date), _to_day(end_date)
+        if start is not None:
+            lo = int(np.searchsorted(days, start, side="left"))
+        if end is not None:
+            hi = int(np.searchsorted(days, end, side="right"))
+        return lo, hi
+
+    def sample(self, region, crop=None, start_date=None, end_date=None):
+        """Draw a random (station name, date) pair for a region/crop, or None if there is none"""
+        bucket = self.buckets.get((region, crop or None))
+        if bucket is None:
+            return None
+        ids, days = bucket
+        lo, hi = self._day_range(days, start_date, end_date)
+        if lo >= hi:
+            return None
+        i = random.randrange(lo, hi)
+        return self.stations[ids[i]], _from_day(days[i])
+
+    def sample_station(self, station_name, start_date=None, end_date=None):
+        """Draw a random date with both weather and soil data for one station, or None"""
+        days = self.station_days.get(station_name)
+        if days is None:
+            return None
+        lo, hi = self._day_range(days, start_date, end_date)
+        if lo >= hi:
+            return None
+        return _from_day(days[random.randrange(lo, hi)])
+
+    def sample_reading(self, table, station_name):
+        """Draw a random date on which a station has a row in one table (weather or soil), or None"""
+        days = self.table_days.get(table, {}).get(station_name)
+        if days is None or not len(days):
+            return None
+        return _from_day(days[random.randrange(len(days))])
+
+    def is_empty(self):
+        """True when nothing was loaded (no stations), e.g. before the first data load"""
+        return not self.stations
+
+    def random_station(self, region):
+        """Pick any station in a region, even one without paired weather/soil data"""
+        names = self.region_stations.get(region)
+        if not names:
+            return None
+        return random.choice(names)
@@ -0,0 +1,196 @@
+import io
+import csv
+import json
+import math
+import datetime
+import decimal
+import warnings
+import numpy as np
+from sqlalchemy import inspect
+
+# Date-range series for one station (/api/stations/<name>/series): the SQL for raw daily
+# rows or weekly/monthly averages, LTTB downsampling, and NDJSON/CSV writers that turn
+# a row iterator into response chunks.
+
+# Tables a series can draw fields from, in the order they are joined (weather drives the dates)
+SERIES_TABLES = {"weather": "w", "soil": "s"}
+
+# Identity and calendar columns; every other column of the tables is a measurement field
+KEY_COLUMNS = {"station", "county", "year", "month", "day", "date", "obs_date"}
+
+RESOLUTIONS = ("day", "week", "month")
+
+# First day of the week (Monday) / month containing a date, per backend
+PERIOD_SQL = {
+    "mysql": {
+        "week": "DATE_SUB({col}, INTERVAL WEEKDAY({col}) DAY)",
+        "month": "DATE_FORMAT({col}, '%Y-%m-01')"
+    },
+    "sqlite": {
+        "week": "date({col}, '-' || ((CAST(strftime('%w', {col}) AS INTEGER) + 6) % 7) || ' days')",
+        "month": "strftime('%Y-%m-01', {col})"
+    }
+}
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def series_fields(engine):
+    """Measurement columns available to a series: {field: table}, weather first"""
+    inspector = inspect(engine)
+    tables = inspector.get_table_names()
+    fields = {}
+    for table in SERIES_TABLES:
+        if table not in tables:
+            continue
+        for column in inspector.get_columns(table):
+            if column["name"] not in KEY_COLUMNS:
+                fields.setdefault(column["name"], table)
+    return fields
+
+
+def parse_date(value, name):
+    """ISO date query parameter -> 'YYYY-MM-DD', None when not given"""
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"'{name}' must be a date like 2020-01-31, got '{value}'")
+
+
+def series_query(dialect_name, available, fields, resolution="day", start=None, end=None):
+    """
+    SQL for one station's series. `available` is series_fields(); `fields` are checked
+    against it before being placed in the query. Returns (sql, params, columns); the
+    station goes in the :station parameter.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution '{resolution}', expected one of {RESOLUTIONS}")
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if not fields:
+        raise ValueError("No fields requested")
+
+    used = [t for t in SERIES_TABLES if any(available[f] == t for f in fields)]
+    base = SERIES_TABLES[used[0]]
+    sql_from = f"FROM {used[0]} {base}"
+    for table in used[1:]:
+        alias = SERIES_TABLES[table]
+        sql_from += f" LEFT JOIN {table} {alias} ON {alias}.station = {base}.station AND {alias}.obs_date = {base}.obs_date"
+
+    where = [f"{base}.station = :station"]
+    params = {}
+    if start:
+        where.append(f"{base}.obs_date >= :start")
+        params["start"] = start
+    if end:
+        where.append(f"{base}.obs_date <= :end")
+        params["end"] = end
+
+    selected = [f"{SERIES_TABLES[available[f]]}.{f}" for f in fields]
+    if resolution == "day":
+        select = ", ".join([f"{base}.obs_date AS obs_date"] + selected)
+        group = ""
+        columns = ["date"] + list(fields)
+    else:
+        period = PERIOD_SQL.get(dialect_name, PERIOD_SQL["mysql"])[resolution].format(col=f"{base}.obs_date")
+        averages = [f"AVG({column}) AS {field}" for column, field in zip(selected, fields)]
+        select = ", ".join([f"{period} AS period", "COUNT(*) AS days"] + averages)
+        group = "GROUP BY 1"
+        columns = ["date", "days"] + list(fields)
+
+    sql = f"SELECT {select} {sql_from} WHERE {' AND '.join(where)} {group} ORDER BY 1"
+    return sql, params, columns
+
+
+def lttb(x, ys, points):
+    """
+    Largest-Triangle-Three-Buckets: indices of `points` rows that keep the visual shape
+    (peaks and troughs) of the series. ys is (rows x fields); each field is scaled to
+    its range and the triangle areas of all fields are added when picking a bucket's row.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(ys, dtype=np.float64).reshape(n, -1)
+    with warnings.catch_warnings():
+        # All-NULL fields just contribute nothing
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low, high = np.nanmin(y, axis=0), np.nanmax(y, axis=0)
+        span = np.where(high > low, high - low, 1.0)
+        y = np.nan_to_num((y - low) / span, nan=0.5)
+
+    # points - 2 buckets between the fixed first and last rows
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        cx, cy = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean(axis=0)
+        areas = np.abs(
+            (x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi, None]) * (cy - y[a])
+        ).sum(axis=1)
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(rows, columns, fields, points):
+    """Apply lttb to a list of row tuples whose first column is the date"""
+    if points is None or len(rows) <= points:
+        return rows
+    days = np.array([_json_value(row[0]) for row in rows], dtype="datetime64[D]").astype(np.int64)
+    first = columns.index(fields[0])
+    values = np.array(
+        [[np.nan if v is None else float(v) for v in row[first:first + len(fields)]] for row in rows],
+        dtype=np.float64
+    )
+    return [rows[i] for i in lttb(days, values, points)]
+
+
+def _json_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()[:10]
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def ndjson_chunks(columns, rows, batch_size=500):
+    """One JSON object per line, yielded batch_size lines at a time"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, map(_json_value, row)))))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def csv_chunks(columns, rows, batch_size=500):
+    """A header line, then CSV rows yielded batch_size at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(["" if v is None else v for v in map(_json_value, row)])
+        count += 1
+        if count >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+WRITERS = {"ndjson": ndjson_chunks, "csv": csv_chunks}
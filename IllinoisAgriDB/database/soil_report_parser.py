@@ -0,0 +1,186 @@
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# Parser for the ICN "Monthly Summary" text reports in project_data/soil_data_txt/<year>/<Month>/.
+# Run from the project root: python -m database.soil_report_parser [REPORT_DIR] [OUT_FILE]
+
+PROJECT_DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)), "project_data")
+REPORT_DIR = os.path.join(PROJECT_DATA, "soil_data_txt")
+OUT_FILE = os.path.join(PROJECT_DATA, "soil_data_csv", "soil_data.csv")
+
+MONTHS = {m: i for i, m in enumerate(
+    ["January", "February", "March", "April", "May", "June", "July",
+     "August", "September", "October", "November", "December"], start=1
+)}
+
+# Stacked header text -> column name used by the weather table
+HEADER_NAMES = {
+    "MAX WIND SPEED": "max_wind_gust",
+    "AVG WIND SPEED": "avg_wind_speed",
+    "DIR AVG WIND": "avg_wind_dir",
+    "TOTAL SOLAR RAD": "sol_rad",
+    "MAX AIR TEMP": "max_air_temp",
+    "MIN AIR TEMP": "min_air_temp",
+    "AVG AIR TEMP": "avg_air_temp",
+    "MAX REL HUM": "max_rel_hum",
+    "MIN REL HUM": "min_rel_hum",
+    "AVG REL HUM": "avg_rel_hum",
+    "AVG DEW POINT": "avg_dewpt_temp",
+    "TOTAL PRECIP": "precip",
+    "TOTAL EVAP": "pot_evapot",
+}
+
+# e.g. MAX 4" SOIL TEMP UNDER BARE SOIL -> max_soil_temp_4in_bare
+SOIL_HEADER = re.compile(r'(MAX|MIN|AVG) (\d+)" SOIL TEMP UNDER (SOD|BARE)')
+
+TITLE = re.compile(r"Monthly Summary For (.+)$")
+MONTH_TITLE = re.compile(r"\b(" + "|".join(MONTHS) + r")\s+(\d{4})\b")
+
+
+def column_name(header_text):
+    """Turn one column's stacked header text into a snake_case column name"""
+    if header_text in HEADER_NAMES:
+        return HEADER_NAMES[header_text]
+    match = SOIL_HEADER.match(header_text)
+    if match:
+        stat, depth, cover = match.groups()
+        return f"{stat.lower()}_soil_temp_{depth}in_{cover.lower()}"
+    slug = re.sub(r"[^a-z0-9]+", "_", header_text.lower().replace('"', "in")).strip("_")
+    return slug or "unnamed"
+
+
+@lru_cache(maxsize=None)
+def compile_layout(header_block):
+    """
+    Work out the column names for one header layout. The header is a stack of
+    tab-separated rows, so a column's name is the text at the same tab position
+    in every row ('MAX' / '4"' / 'SOIL' / 'TEMP' / 'UNDER' / 'SOD'). Reports
+    share a handful of layouts, so the result is cached per header block.
+    """
+    rows = [line.split("\t") for line in header_block.split("\n")]
+    units = rows[-1]   # the "DAY  MPH  MPH ..." line fixes the column count
+    names = ["day"]
+    for j in range(1, len(units)):
+        tokens = [row[j].strip() for row in rows[:-1] if j < len(row) and row[j].strip()]
+        names.append(column_name(" ".join(tokens)))
+    return tuple(names)
+
+
+def _to_float(token):
+    """Parse one report cell: 'M' suffix = missing (NaN), 'E' suffix = estimated (kept)"""
+    token = token.strip()
+    if not token or token.endswith("M"):
+        return np.nan
+    try:
+        return float(token.rstrip("E"))
+    except ValueError:
+        return np.nan
+
+
+def _report_metadata(path, lines):
+    """Station, year and month from the report title, falling back to the file path"""
+    station = os.path.splitext(os.path.basename(path))[0].replace("_", " ")
+    month_dir = os.path.basename(os.path.dirname(path))
+    year_dir = os.path.basename(os.path.dirname(os.path.dirname(path)))
+    year = int(year_dir) if year_dir.isdigit() else None
+    month = MONTHS.get(month_dir)
+    for line in lines[:6]:
+        title = TITLE.search(line.strip())
+        if title:
+            station = title.group(1).strip()
+        month_title = MONTH_TITLE.search(line)
+        if month_title:
+            month, year = MONTHS[month_title.group(1)], int(month_title.group(2))
+    return station, year, month
+
+
+def parse_report(path):
+    """
+    Parse one monthly summary report into a DataFrame with one row per day,
+    or return None when the file is not a report (e.g. a saved 404 page).
+    Values flagged 'M' (missing) become NaN; the 'E' (estimated) flag is dropped.
+    """
+    with open(path, encoding="latin-1") as f:
+        lines = f.read().splitlines()
+    if not any("Monthly Summary" in line for line in lines[:6]):
+        return None
+
+    units_at = next(i for i, line in enumerate(lines) if line.startswith("DAY"))
+    # The header block starts after the title lines (the "Monthly Summary For ..." line)
+    title_at = next(i for i, line in enumerate(lines) if "Monthly Summary" in line)
+    header_block = "\n".join(line.rstrip() for line in lines[title_at + 1:units_at + 1])
+    names = compile_layout(header_block)
+
+    body = []
+    for line in lines[units_at + 1:]:
+        if line.startswith("_") and body:
+            break   # end of the daily rows, the TOT/AVG/MAX/MIN summary follows
+        if line[:1].isdigit():
+            body.append(line.rstrip().split("\t")[:len(names)])
+    if not body:
+        return None
+
+    width = max(len(row) for row in body)
+    values = np.array(
+        [[_to_float(token) for token in row] + [np.nan] * (width - len(row)) for row in body],
+        dtype=np.float32
+    )
+    df = pd.DataFrame(values[:, 1:], columns=list(names[1:width]))
+    df.insert(0, "day", values[:, 0])
+
+    station, year, month = _report_metadata(path, lines)
+    df.insert(0, "station", station)
+    df.insert(1, "year", year)
+    df.insert(2, "month", month)
+    dates = pd.to_datetime(df[["year", "month", "day"]], errors="coerce")
+    df.insert(4, "date", dates.dt.strftime("%Y-%m-%d"))
+    df = df[dates.notna()]
+    return df.astype({"day": np.int8})
+
+
+def list_reports(report_dir):
+    """Every .txt report under report_dir, in a stable order"""
+    return sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(report_dir)
+        for name in files if name.lower().endswith(".txt")
+    )
+
+
+def parse_reports(report_dir=REPORT_DIR, workers=None):
+    """Parse all reports in parallel and return one consolidated DataFrame"""
+    paths = list_reports(report_dir)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(parse_report, paths, chunksize=16))
+
+    parsed = [f for f in frames if f is not None]
+    skipped = len(frames) - len(parsed)
+    if not parsed:
+        raise ValueError(f"No monthly summary reports found in {report_dir}")
+    df = pd.concat(parsed, ignore_index=True).sort_values(["station", "date"], ignore_index=True)
+    print(f"Parsed {len(parsed)} reports ({len(df):,} days, {skipped} non-report files skipped) "
+          f"in {time.perf_counter() - start:.2f}s")
+    return df
+
+
+def write_output(df, out_file=OUT_FILE):
+    """Write the consolidated table; a .parquet path writes Parquet (needs pyarrow), anything else CSV"""
+    os.makedirs(os.path.dirname(os.path.abspath(out_file)), exist_ok=True)
+    if out_file.endswith(".parquet"):
+        df.to_parquet(out_file, index=False)
+    else:
+        df.to_csv(out_file, index=False)
+    print(f"Wrote {len(df):,} rows to {out_file}")
+
+
+if __name__ == "__main__":
+    report_dir = sys.argv[1] if len(sys.argv) > 1 else REPORT_DIR
+    out_file = sys.argv[2] if len(sys.argv) > 2 else OUT_FILE
+    write_output(parse_reports(report_dir), out_file)
@@ -1,11 +1,91 @@
-from flask import request, jsonify
-from ml.inference import predict_one
+from flask import Blueprint, request, jsonify
+from ml.inference import predict_one, predict_stations, registry
+from ml.feature_store import store
+from ml.forecast import forecast, FORECAST_MAX_HORIZON
 
-@app.route("/api/predict", methods=["POST"])
+# Prediction routes; registered on the main app in app.py
+predict_bp = Blueprint("predict", __name__)
+
+@predict_bp.route("/api/predict", methods=["POST"])
 def api_predict():
-    data = request.get_json()
-    station = data["station"]         # e.g. "Big Bend"
-    record  = data["record"]          # {"avg_wind_dir":…, …}
-    # optionally retrain or load per station…
-    pred = predict_one(record)
-    return jsonify({"prediction": pred})
+    data = request.get_json(silent=True) or {}
+    station = data.get("station")     # e.g. "Big Bend"
+    record  = data.get("record")      # {"avg_wind_dir":…, …}
+    date    = data.get("date")        # or "2022-06-01": use the stored feature row for that day
+    if not isinstance(record, dict) and not date:
+        return jsonify({"error": "Request body needs a 'record' object or a 'date'"}), 400
+    if not isinstance(record, dict):
+        record, error = stored_record(station, date)
+        if error:
+            return error
+    try:
+        pred = predict_one(record, station)
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except KeyError as e:
+        return jsonify({"error": f"Missing feature in record: {e}"}), 400
+    except (TypeError, ValueError):
+        return jsonify({"error": "Feature values must be numbers"}), 400
+    return jsonify({"station": station, "prediction": pred})
+
+def stored_record(station, date):
+    """Feature row for (station, date) from the feature store, or (None, error response)"""
+    if not station:
+        return None, (jsonify({"error": "A 'date' lookup needs a 'station'"}), 400)
+    try:
+        return store.get_record(station, date), None
+    except (FileNotFoundError, KeyError) as e:
+        return None, (jsonify({"error": str(e).strip('"')}), 404)
+    except (TypeError, ValueError):
+        return None, (jsonify({"error": f"'date' must be a date like 2022-06-01, got '{date}'"}), 400)
+
+@predict_bp.route("/api/predict/batch", methods=["POST"])
+def api_predict_batch():
+    # {"station": default, "records": [{"station": …, "record": {…}} or {"station": …, "date": …}, …]}
+    data = request.get_json(silent=True) or {}
+    items = data.get("records")
+    if not isinstance(items, list) or not all(
+        isinstance(i, dict) and (isinstance(i.get("record"), dict) or i.get("date")) for i in items
+    ):
+        return jsonify({"error": "Request body needs a 'records' list of {station, record} or {station, date} objects"}), 400
+    stations = [i.get("station", data.get("station")) for i in items]
+    records = []
+    for station, item in zip(stations, items):
+        record = item.get("record")
+        if not isinstance(record, dict):
+            record, error = stored_record(station, item["date"])
+            if error:
+                return error
+        records.append(record)
+    try:
+        preds, errors = predict_stations(stations, records)
+    except KeyError as e:
+        return jsonify({"error": f"Missing feature in records: {e}"}), 400
+    except (TypeError, ValueError):
+        return jsonify({"error": "Feature values must be numbers"}), 400
+    response = {"predictions": preds}
+    if errors:
+        response["errors"] = errors
+    return jsonify(response)
+
+@predict_bp.route("/api/forecast")
+def api_forecast():
+    # ?horizon=7&stations=Peoria,Champaign (all stations when omitted)
+    try:
+        horizon = int(request.args.get("horizon", 7))
+    except ValueError:
+        return jsonify({"error": "'horizon' must be a whole number of days"}), 400
+    if not 1 <= horizon <= FORECAST_MAX_HORIZON:
+        return jsonify({"error": f"'horizon' must be between 1 and {FORECAST_MAX_HORIZON}"}), 400
+    stations = [s.strip() for s in request.args.get("stations", "").split(",") if s.strip()]
+    if not stations:
+        stations = store.columns.load("stations")["station_name"].tolist()
+    results, errors = forecast(stations, horizon)
+    response = {"horizon": horizon, "forecasts": results}
+    if errors:
+        response["errors"] = errors
+    return jsonify(response)
+
+@predict_bp.route("/api/predict/stats")
+def api_predict_stats():
+    return jsonify(registry.stats())
@@ -0,0 +1,150 @@
+# ml/bundle.py
+
+import os
+import time
+import threading
+import numpy as np
+
+from ml.train import FEATURES, MODELS_DIR
+
+# Every station model in one structured .npy, read with mmap_mode="r": server workers
+# share the same page-cache pages, nothing is unpickled and sklearn is never imported.
+# It is written next to the .pkl files; MODEL_BUNDLE_PATH points the server elsewhere.
+BUNDLE_FILE = "bundle.npy"
+BUNDLE_PATH = os.getenv("MODEL_BUNDLE_PATH")
+
+
+def bundle_path(models_dir: str = MODELS_DIR) -> str:
+    """Where the bundle for models_dir lives: MODEL_BUNDLE_PATH if set, else models_dir/bundle.npy"""
+    return BUNDLE_PATH or os.path.join(models_dir, BUNDLE_FILE)
+
+
+def bundle_dtype(n_terms: int, n_features: int) -> np.dtype:
+    """
+    One record per station. Models with fewer expanded terms than n_terms are
+    zero-padded (zero coefficient, zero exponents), which adds nothing to a prediction.
+    source_mtime is the .pkl's st_mtime_ns, so a retrained station can be detected.
+    """
+    return np.dtype([
+        ("station", "U64"),
+        ("features", "U32", (n_features,)),
+        ("n_terms", "i4"),
+        ("intercept", "f8"),
+        ("coef", "f8", (n_terms,)),
+        ("powers", "f8", (n_terms, n_features)),
+        ("source_mtime", "i8"),
+    ])
+
+
+def export_bundle(models_dir: str = MODELS_DIR, out_path: str = None) -> int:
+    """
+    Pack every <station>.pkl in models_dir into one bundle (written to a temporary
+    file and swapped in). Loading the pickles needs sklearn; reading the bundle does not.
+    Returns the number of stations written.
+    """
+    import joblib
+    from urllib.parse import unquote
+
+    start = time.perf_counter()
+    out_path = out_path or bundle_path(models_dir)
+    models = []
+    for name in sorted(os.listdir(models_dir)):
+        path = os.path.join(models_dir, name)
+        if not name.endswith(".pkl"):
+            continue
+        artifact = joblib.load(path)
+        if artifact.get("features") != FEATURES:
+            print(f"  {name}: skipped, trained on different features")
+            continue
+        station = artifact.get("station") or unquote(name[:-len(".pkl")])
+        models.append((station, artifact, os.stat(path).st_mtime_ns))
+    if not models:
+        print(f"No station models in {models_dir}")
+        return 0
+
+    n_terms = max(len(a["model"].coef_) for _, a, _ in models)
+    bundle = np.zeros(len(models), dtype=bundle_dtype(n_terms, len(FEATURES)))
+    for row, (station, artifact, mtime) in zip(bundle, models):
+        m = len(artifact["model"].coef_)
+        row["station"] = station
+        row["features"] = FEATURES
+        row["n_terms"] = m
+        row["intercept"] = float(artifact["model"].intercept_)
+        row["coef"][:m] = artifact["model"].coef_
+        row["powers"][:m] = artifact["poly"].powers_
+        row["source_mtime"] = mtime
+
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, bundle)
+    os.replace(tmp_path, out_path)
+    print(f"✅ Bundled {len(bundle)} station models into {out_path} "
+          f"({os.path.getsize(out_path):,} bytes, {time.perf_counter() - start:.2f}s)")
+    return len(bundle)
+
+
+class ModelBundle:
+    """
+    Read-only view of a bundle file. get() returns the same {"powers", "coef",
+    "intercept"} shape compile_artifact() produces, as views into the memory-map.
+    The file is re-mapped when its mtime changes (e.g. after `python -m ml.bundle`).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+        self._rows = None
+        self._index = {}
+        self._artifacts = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """Map the bundle if it is new or has changed; return False when there is no usable bundle"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._mtime, self._rows, self._index, self._artifacts = None, None, {}, {}
+            return False
+        if mtime != self._mtime:
+            rows = np.load(self.path, mmap_mode="r")
+            self._mtime, self._rows, self._artifacts = mtime, rows, {}
+            self._index = {}
+            if len(rows) and list(rows[0]["features"]) != FEATURES:
+                print(f"Ignoring model bundle {self.path}: its feature order does not match FEATURES")
+            else:
+                self._index = {str(name): i for i, name in enumerate(rows["station"])}
+        return bool(self._index)
+
+    def get(self, station):
+        """The bundled artifact for a station, or None if the bundle doesn't have it"""
+        with self._lock:
+            if not self._refresh() or station not in self._index:
+                return None
+            artifact = self._artifacts.get(station)
+            if artifact is None:
+                row = self._rows[self._index[station]]
+                m = int(row["n_terms"])
+                artifact = {
+                    "station": station,
+                    "features": FEATURES,
+                    "powers": row["powers"][:m],
+                    "coef": row["coef"][:m],
+                    "intercept": float(row["intercept"]),
+                    "source_mtime": int(row["source_mtime"]),
+                }
+                self._artifacts[station] = artifact
+            return artifact
+
+    def stations(self):
+        with self._lock:
+            self._refresh()
+            return list(self._index)
+
+
+if __name__ == "__main__":
+    # python -m ml.bundle [MODELS_DIR] [OUT_PATH]
+    from sys import argv
+    export_bundle(
+        argv[1] if len(argv) > 1 else MODELS_DIR,
+        argv[2] if len(argv) > 2 else None
+    )
@@ -0,0 +1,231 @@
+# ml/feature_store.py
+
+import os
+import json
+import time
+import shutil
+import threading
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+
+from database.column_store import ColumnStore
+from ml.train import (
+    FEATURES, TARGET, BEST_LAG, load_station_counties, merge_counties, daily_frame, add_lags
+)
+
+# Per-station model inputs (FEATURES, lags included) and target, one row per usable day
+FEATURES_DIR = os.getenv("FEATURES_DIR", "ml/features")
+STATE_FILE = "state.json"
+# How many times arrays() re-reads a station whose directory is being swapped
+SWAP_RETRIES = 50
+
+
+class FeatureStore:
+    """
+    Materializes each station's daily feature rows once, from the column store,
+    with the same daily_frame/add_lags steps training uses:
+        ml/features/<station>/days.npy   datetime64[D], sorted
+        ml/features/<station>/X.npy      (days x FEATURES) float64
+        ml/features/<station>/y.npy      target per day
+        ml/features/<station>/state.json last day, the last BEST_LAG targets, source stamps
+    When the CSVs change, only days after the last stored day are computed, seeded
+    with the saved lag state; like incremental ingest, history is assumed unchanged.
+    Reads memory-map the arrays and are cached until state.json changes; a rewrite
+    swaps in a whole new directory, and readers retry while the swap is in progress.
+    """
+
+    def __init__(self, data_dir="project_data", store_dir=FEATURES_DIR):
+        self.data_dir = data_dir
+        self.store_dir = store_dir
+        self.columns = ColumnStore(data_dir)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def station_dir(self, station):
+        return os.path.join(self.store_dir, quote(station, safe=""))
+
+    def read_state(self, station):
+        """Return a station's state.json, or None if it has not been built"""
+        path = os.path.join(self.station_dir(station), STATE_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def source_stamps(self):
+        """Stamps of the soil/weather column store builds the features came from"""
+        return {table: self.columns.ensure(table)["source"] for table in ("soil", "weather")}
+
+    def ensure(self, station):
+        """Build a station's features if missing, append new days if the sources changed"""
+        state = self.read_state(station)
+        if state is None or state["features"] != FEATURES or state["best_lag"] != BEST_LAG:
+            return self.build(station)
+        if state["sources"] != self.source_stamps():
+            return self.append(station)
+        return state
+
+    def build(self, station):
+        """Materialize every feature row for a station from scratch"""
+        start = time.perf_counter()
+        counties = load_station_counties(station, self.data_dir)
+        daily = daily_frame(merge_counties(self.columns, counties))
+        frame = add_lags(daily)
+        state = self._write(station, frame, daily, lag_state=[], previous=None)
+        print(f"Built features for {station}: {len(frame):,} rows ({time.perf_counter() - start:.2f}s)")
+        return state
+
+    def append(self, station):
+        """Add the days after the last stored one, using only the saved lag state as history"""
+        state = self.read_state(station)
+        if state is None:
+            return self.build(station)
+        start = time.perf_counter()
+        last_day = pd.Timestamp(state["last_day"]) if state["last_day"] else None
+        counties = load_station_counties(station, self.data_dir)
+        years = None
+        if last_day is not None:
+            years = range(last_day.year, pd.Timestamp.today().year + 2)
+        daily = daily_frame(merge_counties(self.columns, counties, years=years))
+        if last_day is not None:
+            daily = daily[daily.index > last_day]
+        frame = add_lags(daily, state["lag_state"])
+        # Copy the stored rows out of their memory-maps before the directory is replaced
+        arrays = self.arrays(station)
+        previous = {name: np.array(arrays[name]) for name in ("days", "X", "y")}
+        previous["last_day"] = state["last_day"]
+        with self._lock:
+            self._cache.pop(station, None)
+        state = self._write(station, frame, daily, lag_state=state["lag_state"], previous=previous)
+        print(f"Appended {len(frame):,} feature rows for {station} ({time.perf_counter() - start:.2f}s)")
+        return state
+
+    def _write(self, station, frame, daily, lag_state, previous):
+        """
+        Write arrays (previous rows + frame) and the new state into a fresh directory and
+        swap it in. The old directory is renamed aside first and deleted afterwards, so the
+        station is missing only for the instant between two renames, never while files are removed.
+        """
+        days = frame.index.to_numpy().astype("datetime64[D]")
+        X = frame[FEATURES].to_numpy(dtype=np.float64)
+        y = frame[TARGET].to_numpy(dtype=np.float64)
+        if previous is not None:
+            days = np.concatenate([previous["days"], days])
+            X = np.concatenate([previous["X"], X])
+            y = np.concatenate([previous["y"], y])
+
+        # The next append needs the last BEST_LAG targets, including days dropped for missing inputs
+        targets = np.concatenate([np.asarray(lag_state, dtype=np.float64), daily[TARGET].to_numpy(dtype=np.float64)])
+        last_day = daily.index.max() if len(daily) else None
+        state = {
+            "station": station,
+            "features": FEATURES,
+            "best_lag": BEST_LAG,
+            "rows": len(days),
+            "last_day": str(last_day.date()) if last_day is not None else (previous or {}).get("last_day"),
+            "lag_state": targets[-BEST_LAG:].tolist(),
+            "sources": self.source_stamps(),
+            "built_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+        target_dir = self.station_dir(station)
+        building = target_dir + ".building"
+        shutil.rmtree(building, ignore_errors=True)
+        os.makedirs(building)
+        np.save(os.path.join(building, "days.npy"), days)
+        np.save(os.path.join(building, "X.npy"), X)
+        np.save(os.path.join(building, "y.npy"), y)
+        with open(os.path.join(building, STATE_FILE), "w") as f:
+            json.dump(state, f, indent=2)
+        retired = target_dir + ".old"
+        shutil.rmtree(retired, ignore_errors=True)
+        if os.path.exists(target_dir):
+            os.replace(target_dir, retired)
+        os.replace(building, target_dir)
+        shutil.rmtree(retired, ignore_errors=True)
+        return state
+
+    def arrays(self, station):
+        """
+        {"days", "X", "y", "last_day", "lag_state"} for a station: the arrays memory-mapped,
+        the state fields from the same state.json, cached until rewritten
+        """
+        base = self.station_dir(station)
+        state_path = os.path.join(base, STATE_FILE)
+        for _ in range(SWAP_RETRIES):
+            try:
+                stamp = self._stamp(state_path)
+            except FileNotFoundError:
+                if os.path.exists(base + ".old"):
+                    # _write is between its two renames; the new directory lands right away
+                    time.sleep(0.01)
+                    continue
+                break
+            with self._lock:
+                cached = self._cache.get(station)
+                if cached is not None and cached["stamp"] == stamp:
+                    return cached
+            try:
+                loaded = {name: np.load(os.path.join(base, f"{name}.npy"), mmap_mode="r") for name in ("days", "X", "y")}
+                state = self.read_state(station)
+                # A swap during the reads could mix old and new files; load again if one happened
+                if state is None or self._stamp(state_path) != stamp:
+                    continue
+                loaded["last_day"] = state["last_day"]
+                loaded["lag_state"] = state["lag_state"]
+            except FileNotFoundError:
+                continue
+            loaded["stamp"] = stamp
+            with self._lock:
+                self._cache[station] = loaded
+            return loaded
+        raise FileNotFoundError(f"No features for station '{station}'; run `python -m ml.feature_store {station}`")
+
+    @staticmethod
+    def _stamp(path):
+        """Identifies one written state.json: each rewrite creates a new file in a new directory"""
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_mtime_ns
+
+    def get_vector(self, station, date) -> np.ndarray:
+        """The FEATURES vector for (station, date); KeyError if that day has no feature row"""
+        arrays = self.arrays(station)
+        day = np.datetime64(date, "D")
+        i = int(np.searchsorted(arrays["days"], day))
+        if i >= len(arrays["days"]) or arrays["days"][i] != day:
+            raise KeyError(f"No feature row for '{station}' on {day}")
+        return np.array(arrays["X"][i], dtype=np.float64)
+
+    def get_record(self, station, date) -> dict:
+        """get_vector as a {feature: value} dict, the shape /api/predict records use"""
+        return dict(zip(FEATURES, self.get_vector(station, date).tolist()))
+
+    def frame(self, station) -> pd.DataFrame:
+        """A station's stored rows as a training frame (FEATURES + TARGET, indexed by date)"""
+        arrays = self.arrays(station)
+        df = pd.DataFrame(np.array(arrays["X"]), columns=FEATURES,
+                          index=pd.DatetimeIndex(np.array(arrays["days"]), name="date"))
+        df[TARGET] = np.array(arrays["y"])
+        return df
+
+
+# Shared store for inference; nothing is read until the first lookup
+store = FeatureStore()
+
+
+if __name__ == "__main__":
+    # python -m ml.feature_store <STATION_NAME | all-stations> [DATA_DIR] [FEATURES_DIR]
+    from sys import argv
+    if len(argv) < 2:
+        raise RuntimeError("Usage: python -m ml.feature_store <STATION_NAME | all-stations> [DATA_DIR] [FEATURES_DIR]")
+    features = FeatureStore(argv[2] if len(argv) > 2 else "project_data", argv[3] if len(argv) > 3 else FEATURES_DIR)
+    if argv[1] == "all-stations":
+        stations = features.columns.load("stations")["station_name"]
+    else:
+        stations = [argv[1]]
+    for name in stations:
+        try:
+            features.ensure(name)
+        except Exception as e:
+            print(f"  {name}: skipped, {str(e)}")
@@ -0,0 +1,89 @@
+# ml/forecast.py
+
+import os
+import numpy as np
+import pandas as pd
+
+from ml.train import FEATURES
+from ml.inference import registry, expand
+from ml.feature_store import store
+
+# Longest forecast /api/forecast will run; every step feeds on the previous predictions
+FORECAST_MAX_HORIZON = int(os.getenv("FORECAST_MAX_HORIZON", "60"))
+
+# Positions of Tlag_1, Tlag_2, ... in FEATURES; everything else is held at its last value
+LAG_COLUMNS = [FEATURES.index(f"Tlag_{lag}") for lag in range(1, len(FEATURES) + 1) if f"Tlag_{lag}" in FEATURES]
+
+
+def initial_state(station, features=store):
+    """
+    The input row for the day after a station's last stored day: that day's weather
+    features held as they are, and the lags set from the last targets in state.json.
+    Returns (first forecast day, (len(FEATURES),) row).
+    """
+    arrays = features.arrays(station)
+    if not len(arrays["days"]):
+        raise KeyError(f"No feature rows for station '{station}'")
+    row = np.array(arrays["X"][-1], dtype=np.float64)
+    # From the same snapshot as the arrays; a separate read_state() could see a later swap
+    lag_state = arrays["lag_state"]
+    for lag, column in enumerate(LAG_COLUMNS, start=1):
+        if lag <= len(lag_state):
+            row[column] = lag_state[-lag]
+    return pd.Timestamp(arrays["last_day"]) + pd.Timedelta(days=1), row
+
+
+def rollout(X: np.ndarray, coef: np.ndarray, intercept: np.ndarray, powers: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Recursive forecast for S stations that share one polynomial expansion.
+    X: (S, len(FEATURES)) first-day inputs; coef: (S, m); intercept: (S,)
+    Each step is one expand over all stations plus a row-wise dot; its predictions
+    shift into Tlag_1 (and Tlag_1 into Tlag_2, ...) for the next step.
+    returns: (S, horizon) predictions
+    """
+    X = X.copy()
+    out = np.empty((len(X), horizon))
+    for step in range(horizon):
+        out[:, step] = np.einsum("sm,sm->s", expand(X, powers), coef) + intercept
+        for i in range(len(LAG_COLUMNS) - 1, 0, -1):
+            X[:, LAG_COLUMNS[i]] = X[:, LAG_COLUMNS[i - 1]]
+        if LAG_COLUMNS:
+            X[:, LAG_COLUMNS[0]] = out[:, step]
+    return out
+
+
+def forecast(stations: list, horizon: int, features=store) -> tuple[dict, dict]:
+    """
+    Forecast `horizon` days past each station's stored features.
+    Stations are stacked and grouped by exponent matrix (one group unless models
+    were trained with different degrees), so each step is vectorized across stations.
+    returns: ({station: {"start", "dates", "forecast"}}, {station: error})
+    """
+    errors = {}
+    groups = {}
+    # Artifacts for this request only; going through the bounded LRU would evict and
+    # reload every model per request once there are more stations than MODEL_CACHE_SIZE
+    artifacts = {}
+    for station in stations:
+        try:
+            if station not in artifacts:
+                artifacts[station] = registry.peek(station)
+            artifact = artifacts[station]
+            start, row = initial_state(station, features)
+        except (FileNotFoundError, KeyError) as e:
+            errors[station] = str(e).strip('"')
+            continue
+        group = groups.setdefault(artifact["powers"].tobytes(), {"powers": artifact["powers"], "stations": []})
+        group["stations"].append((station, start, row, artifact["coef"], artifact["intercept"]))
+
+    results = {}
+    for group in groups.values():
+        names, starts, rows, coefs, intercepts = zip(*group["stations"])
+        predictions = rollout(np.vstack(rows), np.vstack(coefs), np.array(intercepts), group["powers"], horizon)
+        for name, start, values in zip(names, starts, predictions):
+            results[name] = {
+                "start": str(start.date()),
+                "dates": [str(d.date()) for d in pd.date_range(start, periods=horizon)],
+                "forecast": values.tolist()
+            }
+    return results, errors
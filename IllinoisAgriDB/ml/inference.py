@@ -1,25 +1,220 @@
 import os
+import time
+import threading
+from collections import OrderedDict
 import joblib
-import pandas as pd
+import numpy as np
 
-# Path to your serialized model; adjust if you keep it elsewhere
+from ml.train import FEATURES, MODELS_DIR, model_path
+from ml.bundle import ModelBundle, bundle_path
+
+# Per-station artifacts written by `python -m ml.train all-stations`
+MODELS_DIR = os.getenv("MODELS_DIR", MODELS_DIR)
+# Single-model artifact written by save_model(); used when a prediction names no station
 MODEL_PATH = os.getenv("MODEL_PATH", "ml/model.pkl")
+# How many station models to keep in memory at once
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "16"))
 
-# Load the model once at import time
-model = joblib.load(MODEL_PATH)
 
-def predict_one(x: dict) -> float:
+class ModelRegistry:
     """
-    x: a dict of feature_name → value for one sample
-    returns: a float prediction
+    Maps station names to their trained artifacts ({"model", "poly"}) and loads
+    them on first use. At most `capacity` models stay in memory; the least
+    recently used one is dropped when a new one is loaded. An artifact whose
+    file has been rewritten since it was loaded (e.g. by ml.online) is reloaded.
+    Stations in the model bundle (ml/bundle.py) are served straight from its
+    memory-map unless their .pkl has changed since the bundle was exported.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, default_path=MODEL_PATH, capacity=MODEL_CACHE_SIZE):
+        self.models_dir = models_dir
+        self.default_path = default_path
+        self.bundle = ModelBundle(bundle_path(models_dir))
+        self.capacity = max(1, capacity)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reloads = 0
+        self.bundle_hits = 0
+        self.load_seconds = 0.0
+
+    def path_for(self, station=None):
+        """Artifact path for a station; the single default model is only used when no station is named"""
+        if station:
+            path = model_path(station, self.models_dir)
+            if os.path.exists(path):
+                return path
+            raise FileNotFoundError(f"No trained model for station '{station}'")
+        if self.default_path and os.path.exists(self.default_path):
+            return self.default_path
+        raise FileNotFoundError("No default model found")
+
+    def get(self, station=None):
+        """Return the compiled {"model", "poly", ...} artifact for a station, loading it if needed"""
+        bundled = self._bundled(station)
+        if bundled is not None:
+            return bundled
+
+        path = self.path_for(station)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == mtime:
+                self._cache.move_to_end(path)
+                self.hits += 1
+                return cached[1]
+            if cached is not None:
+                self.reloads += 1
+            self.misses += 1
+
+        # Load outside the lock so one slow load doesn't block hits on other stations
+        start = time.perf_counter()
+        artifact = compile_artifact(joblib.load(path))
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.load_seconds += elapsed
+            self._cache[path] = (mtime, artifact)
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return artifact
+
+    def peek(self, station=None):
+        """
+        The compiled artifact for one request that uses many stations (/api/forecast):
+        served from the bundle or the cache when it is there, otherwise loaded without
+        entering the LRU, so such a request can't flush the cache or grow it.
+        """
+        bundled = self._bundled(station)
+        if bundled is not None:
+            return bundled
+
+        path = self.path_for(station)
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == mtime:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        start = time.perf_counter()
+        artifact = compile_artifact(joblib.load(path))
+        with self._lock:
+            self.load_seconds += time.perf_counter() - start
+        return artifact
+
+    def _bundled(self, station):
+        """A station's bundle entry, or None if it isn't bundled or its .pkl changed since the export"""
+        bundled = self.bundle.get(station) if station else None
+        if bundled is None:
+            return None
+        pkl = model_path(station, self.models_dir)
+        if os.path.exists(pkl) and os.stat(pkl).st_mtime_ns != bundled["source_mtime"]:
+            return None
+        with self._lock:
+            self.bundle_hits += 1
+        return bundled
+
+    def clear(self):
+        """Drop every cached model (e.g. after retraining)"""
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        """Cache and load statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cached": [os.path.basename(p) for p in self._cache],
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+                "bundle": self.bundle.path if self.bundle.stations() else None,
+                "bundle_hits": self.bundle_hits,
+                "load_seconds": round(self.load_seconds, 4)
+            }
+
+
+def compile_artifact(artifact):
+    """
+    Pull the fitted numbers out of a {"model", "poly"} artifact so prediction is
+    plain NumPy: poly.powers_ gives each expanded column's exponent per input
+    feature, and the linear model is coef_ · X_poly + intercept_.
     """
-    df = pd.DataFrame([x])
-    return float(model.predict(df)[0])
+    artifact["powers"] = np.ascontiguousarray(artifact["poly"].powers_, dtype=np.float64)
+    artifact["coef"] = np.ascontiguousarray(artifact["model"].coef_, dtype=np.float64)
+    artifact["intercept"] = float(artifact["model"].intercept_)
+    return artifact
+
+def to_matrix(rows: list[dict]) -> np.ndarray:
+    """Stack feature dicts into a contiguous float64 array in FEATURES order"""
+    missing = [f for f in FEATURES if any(f not in row for row in rows)]
+    if missing:
+        raise KeyError(", ".join(missing))
+    X = np.array([[row[f] for f in FEATURES] for row in rows], dtype=np.float64).reshape(-1, len(FEATURES))
+    # float64 conversion turns None into NaN (and accepts "inf"); neither gives a usable prediction
+    if not np.isfinite(X).all():
+        raise ValueError("Feature values must be finite numbers")
+    return X
+
+def expand(X: np.ndarray, powers: np.ndarray) -> np.ndarray:
+    """Polynomial expansion of (n, k) inputs with an (m, k) exponent matrix -> (n, m)"""
+    # (n, 1, k) ** (1, m, k) -> product over k gives the (n, m) polynomial expansion
+    return np.prod(X[:, None, :] ** powers[None, :, :], axis=2)
+
+def predict_array(X: np.ndarray, station: str = None) -> np.ndarray:
+    """
+    X: (n_samples, len(FEATURES)) float array
+    returns: (n_samples,) predictions, computed in one vectorized pass
+    """
+    artifact = registry.get(station)
+    return expand(X, artifact["powers"]) @ artifact["coef"] + artifact["intercept"]
+
+
+# Shared registry; nothing is loaded until the first prediction
+registry = ModelRegistry()
 
-def predict_batch(rows: list[dict]) -> list[float]:
+def predict_batch(rows: list[dict], station: str = None) -> list[float]:
     """
     rows: a list of dicts, each dict is one sample
+    station: whose model to use (the default model when omitted)
     returns: a list of float predictions
     """
-    df = pd.DataFrame(rows)
-    return model.predict(df).tolist()
+    return predict_array(to_matrix(rows), station).tolist()
+
+def predict_one(x: dict, station: str = None) -> float:
+    """
+    x: a dict of feature_name → value for one sample
+    returns: a float prediction
+    """
+    return predict_batch([x], station)[0]
+
+def predict_stations(stations: list, rows: list[dict]) -> tuple[list, dict]:
+    """
+    Predict rows that may belong to different stations: rows are grouped by
+    station and each group runs through predict_array once.
+    returns: (predictions aligned with rows, {station: error} for stations without a model)
+    """
+    X = to_matrix(rows)
+    predictions = [None] * len(rows)
+    errors = {}
+    groups = {}
+    for i, station in enumerate(stations):
+        groups.setdefault(station, []).append(i)
+    for station, idx in groups.items():
+        try:
+            y = predict_array(X[idx], station)
+        except FileNotFoundError as e:
+            errors[station or ""] = str(e)
+            continue
+        for i, value in zip(idx, y.tolist()):
+            predictions[i] = value
+    return predictions, errors
@@ -0,0 +1,171 @@
+# ml/model_selection.py
+
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.preprocessing import PolynomialFeatures
+from sklearn.linear_model import LinearRegression
+
+from database.column_store import ColumnStore
+from ml.train import (
+    FEATURES, TARGET, MODELS_DIR, load_station_counties, merge_counties, load_station_frames,
+    daily_frame, add_lags
+)
+
+# Search grid: lag counts, polynomial degrees and named weather feature sets (the lags are always added)
+LAG_GRID = (1, 2, 3, 5, 7)
+DEGREE_GRID = (1, 2, 3)
+FEATURE_SETS = {
+    "current": [f for f in FEATURES if not f.startswith("Tlag_")],
+    "air": ["avg_air_temp", "sol_rad", "precip", "pot_evapot"],
+    "current+air": ["avg_wind_dir", "precip", "pot_evapot", "min_rel_hum", "avg_air_temp", "sol_rad"],
+}
+N_SPLITS = 5
+
+
+def fold_metrics(y_true, y_pred):
+    """(RMSE, MAE, R²) in plain NumPy; sklearn's input checks cost more than the math here"""
+    error = y_true - y_pred
+    total = np.sum((y_true - y_true.mean()) ** 2)
+    return (
+        float(np.sqrt(np.mean(error ** 2))),
+        float(np.mean(np.abs(error))),
+        float(1.0 - np.sum(error ** 2) / total) if total > 0 else 0.0
+    )
+
+
+def evaluate_station(station_name, merged, lags=LAG_GRID, degrees=DEGREE_GRID,
+                     feature_sets=FEATURE_SETS, n_splits=N_SPLITS) -> list:
+    """
+    Score every (lags, degree, feature set) for one station with TimeSeriesSplit:
+    each fold trains on earlier days and tests on the days right after them.
+    The polynomial expansion is row-wise, so each (lags, feature set) design matrix
+    is expanded once at the highest degree and every degree and fold slices it.
+    Returns one result dict per configuration.
+    """
+    daily = daily_frame(merged)
+    splitter = TimeSeriesSplit(n_splits=n_splits)
+    top_degree = max(degrees)
+    results = []
+    for n_lags in lags:
+        df = add_lags(daily, lags=n_lags)
+        for set_name, columns in feature_sets.items():
+            features = columns + [f"Tlag_{lag}" for lag in range(1, n_lags + 1)]
+            config = {"station": station_name, "lags": n_lags, "features": set_name}
+            if len(df) <= n_splits:
+                results += [{**config, "degree": d, "status": "error", "error": "not enough days"} for d in degrees]
+                continue
+
+            start = time.perf_counter()
+            poly = PolynomialFeatures(degree=top_degree, include_bias=False)
+            X_all = poly.fit_transform(df[features].to_numpy(dtype=np.float64))
+            y = df[TARGET].to_numpy(dtype=np.float64)
+            expand_seconds = time.perf_counter() - start
+            folds = list(splitter.split(X_all))
+
+            for degree in degrees:
+                X = X_all[:, poly.powers_.sum(axis=1) <= degree]
+                fold_scores = []
+                fit_seconds = 0.0
+                for train, test in folds:
+                    start = time.perf_counter()
+                    model = LinearRegression().fit(X[train], y[train])
+                    y_pred = model.predict(X[test])
+                    fit_seconds += time.perf_counter() - start
+                    fold_scores.append(fold_metrics(y[test], y_pred))
+                rmse, mae, r2 = np.mean(fold_scores, axis=0)
+                results.append({
+                    **config,
+                    "degree": degree,
+                    "status": "ok",
+                    "columns": X.shape[1],
+                    "rows": len(y),
+                    "rmse": float(rmse),
+                    "rmse_std": float(np.std([s[0] for s in fold_scores])),
+                    "mae": float(mae),
+                    "r2": float(r2),
+                    "fit_seconds": round(fit_seconds, 4),
+                    "expand_seconds": round(expand_seconds, 4)
+                })
+    return results
+
+
+def select_models(
+    stations=None,
+    data_dir: str = "project_data",
+    out_dir: str = MODELS_DIR,
+    lags=LAG_GRID,
+    degrees=DEGREE_GRID,
+    feature_sets=FEATURE_SETS,
+    n_splits: int = N_SPLITS,
+    workers: int = None
+) -> dict:
+    """
+    Run the grid search for some or all stations in parallel (one joblib task per
+    station) and write out_dir/model_selection.csv (every configuration) and
+    out_dir/model_selection.json (grid, timings, best configuration per station).
+    """
+    start = time.perf_counter()
+    if stations is None:
+        _, frames = load_station_frames(data_dir)
+    else:
+        store = ColumnStore(data_dir)
+        frames = {name: merge_counties(store, load_station_counties(name, data_dir)) for name in stations}
+    load_seconds = time.perf_counter() - start
+
+    search_start = time.perf_counter()
+    per_station = Parallel(n_jobs=workers or max(1, min(len(frames), os.cpu_count() or 1)))(
+        delayed(evaluate_station)(name, df, lags, degrees, feature_sets, n_splits)
+        for name, df in frames.items()
+    )
+    search_seconds = time.perf_counter() - search_start
+
+    results = [r for rs in per_station for r in rs]
+    scored = pd.DataFrame([r for r in results if r["status"] == "ok"])
+    best = {}
+    if not scored.empty:
+        for name, group in scored.groupby("station"):
+            row = group.loc[group["rmse"].idxmin()]
+            best[name] = {k: row[k].item() if hasattr(row[k], "item") else row[k]
+                          for k in ("lags", "degree", "features", "rmse", "mae", "r2", "fit_seconds")}
+
+    os.makedirs(out_dir, exist_ok=True)
+    pd.DataFrame(results).to_csv(os.path.join(out_dir, "model_selection.csv"), index=False)
+    report = {
+        "searched_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "data_dir": data_dir,
+        "grid": {"lags": list(lags), "degrees": list(degrees), "feature_sets": feature_sets, "n_splits": n_splits},
+        "timings": {
+            "load_seconds": round(load_seconds, 4),
+            "search_seconds": round(search_seconds, 4),
+            "total_seconds": round(time.perf_counter() - start, 4)
+        },
+        "best": best,
+        "results": results
+    }
+    with open(os.path.join(out_dir, "model_selection.json"), "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, b in best.items():
+        print(f"  {name}: lags={b['lags']} degree={b['degree']} features={b['features']} "
+              f"rmse={b['rmse']:.3f} ({b['fit_seconds']:.3f}s to fit {n_splits} folds)")
+    print(f"✅ Evaluated {len(results)} configurations in {report['timings']['total_seconds']:.2f}s, "
+          f"report in {os.path.join(out_dir, 'model_selection.json')}")
+    return report
+
+
+if __name__ == "__main__":
+    # python -m ml.model_selection <STATION_NAME | all-stations> [DATA_DIR] [OUT_DIR]
+    from sys import argv
+    if len(argv) < 2:
+        raise RuntimeError("Usage: python -m ml.model_selection <STATION_NAME | all-stations> [DATA_DIR] [OUT_DIR]")
+    select_models(
+        None if argv[1] == "all-stations" else [argv[1]],
+        argv[2] if len(argv) > 2 else "project_data",
+        argv[3] if len(argv) > 3 else MODELS_DIR
+    )
@@ -0,0 +1,111 @@
+# ml/online.py
+
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+from ml.train import FEATURES, TARGET, MODELS_DIR, model_path
+from ml.inference import expand
+from ml.feature_store import FeatureStore, FEATURES_DIR
+from ml.bundle import export_bundle, bundle_path
+
+# Online updates of the per-station models. Each artifact written by
+# `python -m ml.train all-stations` carries its sufficient statistics ("online":
+# ZᵀZ, Zᵀy over Z = [1, polynomial features], row count, last day). New days from
+# the feature store are added to them, which costs the same whatever the history
+# length, and the coefficients are re-solved from the small (m+1) x (m+1) system.
+# The artifact file is replaced atomically; ModelRegistry reloads it on the next
+# prediction because its modification time changed.
+
+
+def solve(online: dict):
+    """
+    Least-squares (intercept, coef) from ZᵀZ / Zᵀy. The system is scaled to a unit
+    diagonal first, since squared wind directions and precipitation differ by ~10⁵.
+    """
+    xtx, xty = online["xtx"], online["xty"]
+    scale = np.sqrt(np.diag(xtx))
+    scale[scale == 0] = 1.0
+    w = np.linalg.lstsq(xtx / scale[:, None] / scale[None, :], xty / scale, rcond=None)[0] / scale
+    return float(w[0]), w[1:]
+
+
+def update_artifact(artifact: dict, X: np.ndarray, y: np.ndarray, last_day) -> dict:
+    """Add rows (raw FEATURES in X, target y) to an artifact's statistics and refit its model"""
+    online = artifact["online"]
+    X_poly = expand(np.asarray(X, dtype=np.float64), np.asarray(artifact["poly"].powers_, dtype=np.float64))
+    Z = np.hstack([np.ones((len(X_poly), 1)), X_poly])
+    online["xtx"] = online["xtx"] + Z.T @ Z
+    online["xty"] = online["xty"] + Z.T @ np.asarray(y, dtype=np.float64)
+    online["n"] += len(y)
+    online["last_day"] = str(pd.Timestamp(last_day).date())
+
+    intercept, coef = solve(online)
+    artifact["model"].intercept_ = intercept
+    artifact["model"].coef_ = coef
+    return artifact
+
+
+def update_station(station: str, store: FeatureStore, models_dir: str = MODELS_DIR) -> int:
+    """
+    Fold the station's feature rows after the artifact's last day into its model.
+    Returns the number of days added (0 when it is already current).
+    """
+    path = model_path(station, models_dir)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No trained model for station '{station}'")
+    artifact = joblib.load(path)
+    if "online" not in artifact or artifact.get("features") != FEATURES:
+        raise ValueError(f"Model for '{station}' has no online statistics; retrain it with `python -m ml.train all-stations`")
+
+    frame = store.frame(station)
+    new = frame[frame.index > pd.Timestamp(artifact["online"]["last_day"])]
+    if new.empty:
+        return 0
+    update_artifact(artifact, new[FEATURES].to_numpy(), new[TARGET].to_numpy(), new.index[-1])
+
+    # Write next to the artifact and swap it in, so a worker never loads a half-written file
+    tmp_path = path + ".tmp"
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
+    return len(new)
+
+
+def update_all(stations=None, data_dir: str = "project_data", models_dir: str = MODELS_DIR,
+               features_dir: str = FEATURES_DIR) -> dict:
+    """
+    Bring the feature store and then every station's model up to date, and re-export
+    the model bundle if there is one; returns {station: days added}
+    """
+    store = FeatureStore(data_dir, features_dir)
+    if stations is None:
+        stations = store.columns.load("stations")["station_name"]
+    added = {}
+    for name in stations:
+        start = time.perf_counter()
+        try:
+            store.ensure(name)
+            added[name] = update_station(name, store, models_dir)
+            print(f"  {name}: +{added[name]} days ({time.perf_counter() - start:.3f}s)")
+        except Exception as e:
+            print(f"  {name}: skipped, {str(e)}")
+    # Same location ModelRegistry serves from, so MODEL_BUNDLE_PATH is honoured
+    bundle = bundle_path(models_dir)
+    if any(added.values()) and os.path.exists(bundle):
+        export_bundle(models_dir, bundle)
+    return added
+
+
+if __name__ == "__main__":
+    # python -m ml.online <STATION_NAME | all-stations> [DATA_DIR] [MODELS_DIR] [FEATURES_DIR]
+    from sys import argv
+    if len(argv) < 2:
+        raise RuntimeError("Usage: python -m ml.online <STATION_NAME | all-stations> [DATA_DIR] [MODELS_DIR] [FEATURES_DIR]")
+    update_all(
+        None if argv[1] == "all-stations" else [argv[1]],
+        argv[2] if len(argv) > 2 else "project_data",
+        argv[3] if len(argv) > 3 else MODELS_DIR,
+        argv[4] if len(argv) > 4 else FEATURES_DIR
+    )
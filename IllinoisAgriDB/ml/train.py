@@ -1,96 +1,140 @@
 # ml/train.py
 
 import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+import numpy as np
 import pandas as pd
 import joblib
 
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.linear_model import LinearRegression
+from database.column_store import ColumnStore
+from database.counties import split_location
+
+FEATURES = ["avg_wind_dir", "precip", "pot_evapot", "min_rel_hum", "Tlag_1", "Tlag_2"]
+TARGET = "avg_soil_temp_8in_sod"
+# Tlag_1..Tlag_BEST_LAG: the target on the previous days that have a target reading
+BEST_LAG = 2
+DEGREE = 2
+MODELS_DIR = "ml/models"
 
 def load_station_counties(station_name: str, data_dir: str) -> list[str]:
     """
-    Read station.csv, look up the row for `station_name`,
-    split its 'location' field into a list of counties.
+    Read the stations table (from the column store built off station.csv),
+    look up the row for `station_name`, split its 'location' field into a list of counties.
     """
-    stations = pd.read_csv(os.path.join(data_dir, "station.csv"))
+    stations = ColumnStore(data_dir).load("stations")
     row = stations.loc[stations["station_name"] == station_name]
     if row.empty:
         raise ValueError(f"Station '{station_name}' not found in station.csv")
-    # e.g. "St.Clair, Monroe, Madison" → ["St.Clair","Monroe","Madison"]
-    return [c.strip() for c in row.iloc[0]["location"].split(",")]
+    return split_location(row.iloc[0]["location"])
 
-def load_and_merge(station_name: str, data_dir: str) -> pd.DataFrame:
+def merge_counties(store: ColumnStore, counties, years=None) -> pd.DataFrame:
+    """Load soil & weather for the given counties (and years) and inner join them on ['date','county']"""
+    soil    = store.load("soil", counties=counties, years=years)
+    weather = store.load("weather", counties=counties, years=years)
+    return pd.merge(soil, weather, on=["date", "county"], how="inner")
+
+def daily_frame(df: pd.DataFrame) -> pd.DataFrame:
     """
-    1) Load soil & weather CSVs
-    2) Filter both to only the counties in this station
-    3) Merge on ['date','county']
-    4) Do your date‐indexing, lag features, dropna, etc.
+    Keep the target soil column, index a merged soil/weather frame by day
+    and drop the days without a target reading.
     """
-    counties = load_station_counties(station_name, data_dir)
-
-    soil = pd.read_csv(
-        os.path.join(data_dir, "soil_condition.csv"),
-        parse_dates=["date"]
-    )
-    weather = pd.read_csv(
-        os.path.join(data_dir, "weather.csv"),
-        parse_dates=["date"]
-    )
-
-    # keep only rows for these counties
-    soil    = soil[soil["county"].isin(counties)]
-    weather = weather[weather["county"].isin(counties)]
-
-    # inner join on date & county
-    df = pd.merge(soil, weather, on=["date", "county"], how="inner")
-
-    # --- now replicate your earlier cleaning (pics 2–3) ---
-    # e.g. drop unwanted soil cols, reset index, asfreq, dropna on target, dedupe
     soil_cols    = [c for c in df.columns if "soil" in c]
-    drop_soil    = [c for c in soil_cols if c != "avg_soil_temp_8in_sod"]
+    drop_soil    = [c for c in soil_cols if c != TARGET]
     df = df.drop(columns=drop_soil + ["station", "year", "month", "day"], errors="ignore")
 
-    df = df.set_index("date").asfreq("D").dropna(subset=["avg_soil_temp_8in_sod"])
+    # A station spanning several counties has one row per county per day; keep the first
+    df = df.set_index("date").sort_index(kind="stable")
     df = df[~df.index.duplicated(keep="first")]
+    return df.asfreq("D").dropna(subset=[TARGET])
 
-    # lag features
-    best_lag = 2
-    for lag in range(1, best_lag + 1):
-        df[f"Tlag_{lag}"] = df["avg_soil_temp_8in_sod"].shift(lag)
-    df = df.dropna()
+def add_lags(df: pd.DataFrame, lag_state=None, lags: int = BEST_LAG) -> pd.DataFrame:
+    """
+    Add Tlag_1..Tlag_<lags> to a daily_frame and dropna.
+    lag_state: the target values just before df's first day (oldest first), so an
+    appended frame gets the same lags as if it had been prepared with its history.
+    """
+    seed = np.full(lags, np.nan)
+    if lag_state is not None and len(lag_state):
+        tail = np.asarray(lag_state, dtype=np.float64)[-lags:]
+        seed[lags - len(tail):] = tail
+    padded = np.concatenate([seed, df[TARGET].to_numpy(dtype=np.float64)])
+    df = df.copy()
+    for lag in range(1, lags + 1):
+        df[f"Tlag_{lag}"] = padded[lags - lag:lags - lag + len(df)]
+    return df.dropna()
+
+def prepare_features(df: pd.DataFrame, lag_state=None) -> pd.DataFrame:
+    """
+    Turn a merged soil/weather frame into the training frame:
+    keep the target soil column, index by day, add lag features, dropna.
+    """
+    return add_lags(daily_frame(df), lag_state)
 
-    return df
+def load_and_merge(station_name: str, data_dir: str) -> pd.DataFrame:
+    """
+    1) Load soil & weather for only the counties in this station
+       (county partitions of the column store, rebuilt if the CSVs changed)
+    2) Merge on ['date','county']
+    3) Do your date‐indexing, lag features, dropna, etc.
+    """
+    counties = load_station_counties(station_name, data_dir)
+    return prepare_features(merge_counties(ColumnStore(data_dir), counties))
 
 def train_model(
     station_name: str,
     data_dir: str = "project_data",      # or wherever you keep your CSVs
-    test_size: float = 0.2,
-    random_state: int = 42
+    test_size: float = 0.2
 ):
     df = load_and_merge(station_name, data_dir)
+    model, poly, _ = fit_frame(df, test_size)
+    return model, poly
+
+def fit_frame(df: pd.DataFrame, test_size: float = 0.2):
+    """Fit the polynomial regression on a prepared frame; returns (model, poly, test metrics)"""
+    # sklearn is only needed to fit; serving (ml.inference, ml.bundle) imports this module without it
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import PolynomialFeatures
+    from sklearn.linear_model import LinearRegression
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
     # pick your features & target just as you did before
-    X = df[[
-        "avg_wind_dir", "precip", "pot_evapot",
-        "min_rel_hum", "Tlag_1", "Tlag_2"
-    ]]
-    y = df["avg_soil_temp_8in_sod"]
+    X = df[FEATURES]
+    y = df[TARGET]
 
     # polynomial transform
-    poly = PolynomialFeatures(degree=2, include_bias=False)
+    poly = PolynomialFeatures(degree=DEGREE, include_bias=False)
     X_poly = poly.fit_transform(X)
 
-    # train/test split
+    # train/test split: the last test_size of the days, never shuffled, since the
+    # lag features would otherwise leak later days into training
     X_train, X_test, y_train, y_test = train_test_split(
-        X_poly, y, test_size=test_size, random_state=random_state
+        X_poly, y, test_size=test_size, shuffle=False
     )
 
     # instantiate & fit your estimator
     model = LinearRegression()
     model.fit(X_train, y_train)
 
-    return model, poly
+    y_pred = model.predict(X_test)
+    metrics = {
+        "train_rows": len(X_train),
+        "test_rows": len(X_test),
+        "r2": float(r2_score(y_test, y_pred)),
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred)))
+    }
+    return model, poly, metrics
+
+def online_state(X_poly: np.ndarray, y: np.ndarray, last_day) -> dict:
+    """
+    Sufficient statistics of the fitted rows for online updates (ml/online.py):
+    ZᵀZ and Zᵀy over Z = [1, X_poly], the row count and the last day included.
+    """
+    Z = np.hstack([np.ones((len(X_poly), 1)), X_poly])
+    return {"xtx": Z.T @ Z, "xty": Z.T @ y, "n": len(y), "last_day": str(pd.Timestamp(last_day).date())}
 
 def save_model(
     station_name: str,
@@ -105,9 +149,112 @@ def save_model(
     joblib.dump({"model": model, "poly": poly}, out_path)
     print(f"✅ Saved model + transformer to {out_path}")
 
+def model_path(station_name: str, out_dir: str = MODELS_DIR) -> str:
+    """Per-station artifact path, e.g. ml/models/Big%20Bend.pkl"""
+    return os.path.join(out_dir, f"{quote(station_name, safe='')}.pkl")
+
+def _train_station(args):
+    """Process pool entry point: fit one station's frame and write its artifact"""
+    station_name, df, out_dir, test_size = args
+    start = time.perf_counter()
+    try:
+        df = prepare_features(df)
+        if len(df) < 2:
+            raise ValueError("not enough overlapping soil/weather days")
+        model, poly, metrics = fit_frame(df, test_size)
+        # The split is chronological, so the training rows are the first train_rows days
+        train = df.iloc[:metrics["train_rows"]]
+        online = online_state(poly.transform(train[FEATURES]), train[TARGET].to_numpy(dtype=np.float64), train.index[-1])
+        path = model_path(station_name, out_dir)
+        joblib.dump({"model": model, "poly": poly, "station": station_name, "features": FEATURES,
+                     "online": online}, path)
+        return {"station": station_name, "status": "ok", "path": path,
+                "seconds": round(time.perf_counter() - start, 4), **metrics}
+    except Exception as e:
+        return {"station": station_name, "status": "error", "error": str(e),
+                "seconds": round(time.perf_counter() - start, 4)}
+
+def load_station_frames(data_dir: str = "project_data"):
+    """
+    Load & merge soil/weather once for every station's counties, then partition the
+    merged frame by station. Returns (merged, {station: merged rows of its counties}).
+    """
+    store    = ColumnStore(data_dir)
+    stations = store.load("stations")
+    station_counties = {
+        name: split_location(location)
+        for name, location in zip(stations["station_name"], stations["location"])
+    }
+    merged = merge_counties(store, sorted({c for cs in station_counties.values() for c in cs}))
+
+    # Partition once: county -> row positions, then each station takes the union of its counties
+    positions = merged.groupby("county").indices
+    frames = {}
+    for name, counties in station_counties.items():
+        rows = [positions[c] for c in counties if c in positions]
+        rows = np.sort(np.concatenate(rows)) if rows else np.array([], dtype=np.int64)
+        frames[name] = merged.iloc[rows]
+    return merged, frames
+
+def train_all_stations(
+    data_dir: str = "project_data",
+    out_dir: str = MODELS_DIR,
+    test_size: float = 0.2,
+    workers: int = None
+) -> dict:
+    """
+    Train every station in station.csv in one run:
+    1) load & merge soil/weather once for all counties
+    2) partition the merged frame by each station's counties
+    3) fit each station in a process pool, writing ml/models/<station>.pkl
+    4) write ml/models/summary.json with timings and test metrics
+    """
+    start = time.perf_counter()
+    merged, frames = load_station_frames(data_dir)
+    load_seconds = time.perf_counter() - start
+    tasks = [(name, df, out_dir, test_size) for name, df in frames.items()]
+
+    os.makedirs(out_dir, exist_ok=True)
+    fit_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or max(1, min(len(tasks), os.cpu_count() or 1))) as pool:
+        results = list(pool.map(_train_station, tasks))
+    fit_seconds = time.perf_counter() - fit_start
+
+    for r in results:
+        if r["status"] == "ok":
+            print(f"  {r['station']}: r2={r['r2']:.3f} rmse={r['rmse']:.3f} ({r['seconds']:.2f}s)")
+        else:
+            print(f"  {r['station']}: skipped, {r['error']}")
+
+    summary = {
+        "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "data_dir": data_dir,
+        "rows_loaded": len(merged),
+        "stations": len(results),
+        "trained": sum(r["status"] == "ok" for r in results),
+        "timings": {
+            "load_seconds": round(load_seconds, 4),
+            "fit_seconds": round(fit_seconds, 4),
+            "total_seconds": round(time.perf_counter() - start, 4)
+        },
+        "results": results
+    }
+    with open(os.path.join(out_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"✅ Trained {summary['trained']}/{summary['stations']} stations in "
+          f"{summary['timings']['total_seconds']:.2f}s, summary in {os.path.join(out_dir, 'summary.json')}")
+    return summary
+
 if __name__ == "__main__":
     # e.g. run `py -c "import ml.train; ml.train.save_model('St.Louis')"`
+    # or train every station at once: python -m ml.train all-stations [DATA_DIR] [OUT_DIR]
     from sys import argv
     if len(argv) < 2:
-        raise RuntimeError("Usage: python -m ml.train <STATION_NAME> [DATA_DIR]")
-    save_model(argv[1], argv[2] if len(argv) > 2 else "project_data")
+        raise RuntimeError("Usage: python -m ml.train <STATION_NAME | all-stations> [DATA_DIR] [OUT_DIR]")
+    if argv[1] == "all-stations":
+        train_all_stations(
+            argv[2] if len(argv) > 2 else "project_data",
+            argv[3] if len(argv) > 3 else MODELS_DIR
+        )
+    else:
+        save_model(argv[1], argv[2] if len(argv) > 2 else "project_data")